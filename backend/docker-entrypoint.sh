@@ -14,6 +14,10 @@ echo "PostgreSQL is ready!"
 echo "Running migrations..."
 python manage.py migrate --noinput
 
+# Создать недостающие превью картинок товаров
+echo "Creating thumbnails..."
+python manage.py create_thumbnails
+
 # Собрать статические файлы
 echo "Collecting static files..."
 python manage.py collectstatic --noinput
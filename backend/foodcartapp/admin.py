@@ -6,12 +6,15 @@ from django.utils.http import url_has_allowed_host_and_scheme
 from django.forms import ModelForm
 from django.http import HttpResponseRedirect
 
+from .models import Banner
 from .models import Product
 from .models import ProductCategory
 from .models import Restaurant
 from .models import RestaurantMenuItem
 from .models import Order
+from .models import OrderIntake
 from .models import OrderItem
+from .thumbnails import get_thumbnail_url
 
 
 class RestaurantMenuItemInline(admin.TabularInline):
@@ -50,9 +53,8 @@ class ProductAdmin(admin.ModelAdmin):
     list_filter = [
         'category',
     ]
+    # Сам поиск — в get_search_results, список нужен, чтобы админка показала поле поиска
     search_fields = [
-        # FIXME SQLite can not convert letter case for cyrillic words properly, so search will be buggy.
-        # Migration to PostgreSQL is necessary
         'name',
         'category__name',
     ]
@@ -95,21 +97,74 @@ class ProductAdmin(admin.ModelAdmin):
     def get_image_preview(self, obj):
         if not obj.image:
             return 'выберите картинку'
-        return format_html('<img src="{url}" style="max-height: 200px;"/>', url=obj.image.url)
+        return format_html('<img src="{url}" style="max-height: 200px;"/>', url=get_thumbnail_url(obj, 300))
     get_image_preview.short_description = 'превью'
 
     def get_image_list_preview(self, obj):
         if not obj.image or not obj.id:
             return 'нет картинки'
         edit_url = reverse('admin:foodcartapp_product_change', args=(obj.id,))
-        return format_html('<a href="{edit_url}"><img src="{src}" style="max-height: 50px;"/></a>', edit_url=edit_url, src=obj.image.url)
+        return format_html('<a href="{edit_url}"><img src="{src}" style="max-height: 50px;"/></a>', edit_url=edit_url, src=get_thumbnail_url(obj, 100))
     get_image_list_preview.short_description = 'превью'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Вместо ILIKE '%...%' по каждому полю — индексы по tsvector и триграммам
+        if not search_term:
+            return queryset, False
+        return queryset.search(search_term), False
+
 
 @admin.register(ProductCategory)
 class ProductAdmin(admin.ModelAdmin):
     pass
 
+@admin.register(Banner)
+class BannerAdmin(admin.ModelAdmin):
+    list_display = [
+        'get_image_list_preview',
+        'title',
+        'position',
+        'is_active',
+        'starts_at',
+        'ends_at',
+    ]
+    list_display_links = [
+        'title',
+    ]
+    list_editable = [
+        'position',
+        'is_active',
+    ]
+    list_filter = [
+        'is_active',
+    ]
+    readonly_fields = [
+        'get_image_preview',
+    ]
+    fields = [
+        'title',
+        'text',
+        'image',
+        'get_image_preview',
+        'position',
+        'is_active',
+        'starts_at',
+        'ends_at',
+    ]
+
+    def get_image_preview(self, obj):
+        if not obj.image:
+            return 'выберите картинку'
+        return format_html('<img src="{url}" style="max-height: 200px;"/>', url=obj.image.url)
+    get_image_preview.short_description = 'превью'
+
+    def get_image_list_preview(self, obj):
+        if not obj.image:
+            return 'нет картинки'
+        return format_html('<img src="{src}" style="max-height: 50px;"/>', src=obj.image.url)
+    get_image_list_preview.short_description = 'превью'
+
+
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 1
@@ -128,3 +183,11 @@ class OrderAdmin(admin.ModelAdmin):
             self.message_user(request, "Заказ сохранён, возвращаем вас назад.")
             return HttpResponseRedirect(next_url)
         return res
+
+
+@admin.register(OrderIntake)
+class OrderIntakeAdmin(admin.ModelAdmin):
+    list_display = ['receipt', 'status', 'order', 'created_at', 'processed_at']
+    list_filter = ['status']
+    search_fields = ['receipt']
+    readonly_fields = ['receipt', 'payload', 'status', 'order', 'error', 'created_at', 'processed_at']
@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class FoodcartappConfig(AppConfig):
     default_auto_field = 'django.db.models.AutoField'
     name = 'foodcartapp'
+
+    def ready(self):
+        from . import (  # noqa: F401
+            banners,
+            catalog,
+            menu_index,
+            order_changes,
+            product_availability,
+            product_search,
+            thumbnails,
+        )
@@ -0,0 +1,64 @@
+import hashlib
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Min, Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from star_burger.renderers import dumps
+from .models import Banner
+
+
+BANNERS_CACHE_KEY = 'foodcartapp:banners:v2'
+
+
+def serialize_banner(banner):
+    return {
+        'title': banner.title,
+        'src': banner.image.url,
+        'text': banner.text,
+    }
+
+
+def get_next_banners_change(now):
+    # Ближайший момент, когда какой-то баннер начнёт или перестанет показываться
+    boundaries = Banner.objects.filter(is_active=True).aggregate(
+        next_start=Min('starts_at', filter=Q(starts_at__gt=now)),
+        next_end=Min('ends_at', filter=Q(ends_at__gt=now)),
+    )
+    boundaries = [moment for moment in boundaries.values() if moment]
+    return min(boundaries) if boundaries else None
+
+
+def dump_banners():
+    now = timezone.now().replace(microsecond=0)
+    payload = dumps([serialize_banner(banner) for banner in Banner.objects.active(now)])
+    return {
+        'payload': payload,
+        'etag': hashlib.md5(payload).hexdigest(),
+        'modified_at': now,
+        'expires_at': get_next_banners_change(now),
+    }
+
+
+def get_banners():
+    banners = cache.get(BANNERS_CACHE_KEY)
+    if banners is None or (banners['expires_at'] and banners['expires_at'] <= timezone.now()):
+        banners = dump_banners()
+        timeout = None
+        if banners['expires_at']:
+            timeout = max((banners['expires_at'] - timezone.now()).total_seconds(), 1)
+        cache.set(BANNERS_CACHE_KEY, banners, timeout=timeout)
+    return banners
+
+
+def invalidate_banners():
+    cache.delete(BANNERS_CACHE_KEY)
+
+
+@receiver(post_save, sender=Banner)
+@receiver(post_delete, sender=Banner)
+def on_banner_change(sender, **kwargs):
+    transaction.on_commit(invalidate_banners)
@@ -0,0 +1,100 @@
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from star_burger.renderers import dumps
+from .models import Product, ProductCategory, RestaurantMenuItem
+from .thumbnails import get_srcsets
+
+
+CATALOG_CACHE_KEY = 'foodcartapp:catalog:v3:{etag}'
+CATALOG_VERSION_KEY = 'foodcartapp:catalog_version'
+
+
+def serialize_product(product):
+    return {
+        'id': product.id,
+        'name': product.name,
+        'price': product.price,
+        'special_status': product.special_status,
+        'description': product.description,
+        'category': {
+            'id': product.category.id,
+            'name': product.category.name,
+        } if product.category else None,
+        'image': product.image.url,
+        **get_srcsets(product),
+        'restaurant': {
+            'id': product.id,
+            'name': product.name,
+        }
+    }
+
+
+def get_catalog_products():
+    return Product.objects.select_related('category').available().order_by('id')
+
+
+def dump_catalog():
+    products = get_catalog_products()
+    dumped_products = [serialize_product(product) for product in products]
+    return dumps(dumped_products)
+
+
+def iter_catalog(chunk_size=2000, pretty=False):
+    # Каталог отдаётся кусками, весь список товаров в памяти не собирается
+    yield b'['
+    products_count = 0
+    for product in get_catalog_products().iterator(chunk_size=chunk_size):
+        dumped_product = dumps(serialize_product(product), pretty=pretty)
+        if pretty:
+            # Те же отступы, что у dumps(..., pretty=True) для всего списка
+            dumped_product = b'\n  ' + dumped_product.replace(b'\n', b'\n  ')
+        yield (b',' if products_count else b'') + dumped_product
+        products_count += 1
+    yield b'\n]' if pretty and products_count else b']'
+
+
+def create_catalog_version():
+    return {
+        'etag': uuid4().hex,
+        'modified_at': timezone.now().replace(microsecond=0),
+    }
+
+
+def get_catalog_version():
+    return cache.get_or_set(CATALOG_VERSION_KEY, create_catalog_version, timeout=None)
+
+
+def get_catalog_payload(version=None):
+    # Ключ включает версию каталога, поэтому старые данные просто перестают читаться
+    version = version or get_catalog_version()
+    cache_key = CATALOG_CACHE_KEY.format(etag=version['etag'])
+    payload = cache.get(cache_key)
+    if payload is None:
+        payload = dump_catalog()
+        cache.set(cache_key, payload, timeout=None)
+    return payload
+
+
+def invalidate_catalog():
+    # Каталог прошлой версии больше не прочитают, удаляем его, чтобы не копить в кэше
+    version = cache.get(CATALOG_VERSION_KEY)
+    cache.set(CATALOG_VERSION_KEY, create_catalog_version(), timeout=None)
+    if version is not None:
+        cache.delete(CATALOG_CACHE_KEY.format(etag=version['etag']))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_delete, sender=ProductCategory)
+@receiver(post_save, sender=RestaurantMenuItem)
+@receiver(post_delete, sender=RestaurantMenuItem)
+def on_catalog_change(sender, **kwargs):
+    # Сбрасываем после коммита, иначе параллельный запрос успеет закэшировать старые данные
+    transaction.on_commit(invalidate_catalog)
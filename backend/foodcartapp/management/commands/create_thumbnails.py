@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from foodcartapp.models import Product
+from foodcartapp.thumbnails import update_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Создаёт недостающие превью картинок товаров и записывает, какие готовы'
+
+    def handle(self, *args, **options):
+        # Запускается при деплое: товар без превью не ошибка, вместо них отдаётся исходная картинка
+        expected_count = 2 * len(settings.THUMBNAIL_WIDTHS)
+        incomplete_count = 0
+        products = Product.objects.exclude(image='').only('id', 'name', 'image', 'thumbnails').order_by('id')
+        for product in products:
+            if len(update_thumbnails(product)) < expected_count:
+                incomplete_count += 1
+                self.stderr.write(f'{product.id} {product.name}: не все превью созданы из {product.image.name}')
+
+        if incomplete_count:
+            self.stderr.write(f'Товаров без части превью: {incomplete_count}')
+        else:
+            self.stdout.write('Превью готовы')
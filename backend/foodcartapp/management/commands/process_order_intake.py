@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from foodcartapp.order_intake import process_intake_batch
+
+
+class Command(BaseCommand):
+    help = 'Создаёт заказы, принятые в очередь при ORDER_INTAKE_QUEUE'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Разобрать очередь один раз и выйти')
+        parser.add_argument('--interval', type=float, default=1, help='Пауза, когда очередь пуста, секунд')
+        parser.add_argument('--batch-size', type=int, default=500, help='Сколько заказов создавать за раз')
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            processed = process_intake_batch(options['batch_size'])
+            if processed:
+                self.stdout.write(f'Обработано заказов из очереди: {processed}')
+                # Пока очередь не пуста, следующую пачку берём без паузы
+                continue
+
+            if options['once']:
+                break
+            time.sleep(options['interval'])
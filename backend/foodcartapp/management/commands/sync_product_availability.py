@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F, Q
+
+from foodcartapp.catalog import invalidate_catalog
+from foodcartapp.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Сверяет денормализованную доступность товаров с меню ресторанов и исправляет расхождения'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Только показать расхождения, ничего не менять')
+
+    def handle(self, *args, **options):
+        drifted_products = (
+            Product.objects
+            .with_actual_availability()
+            .filter(
+                ~Q(is_available=F('actual_is_available'))
+                | ~Q(available_restaurants_count=F('actual_available_restaurants_count'))
+            )
+            .order_by('id')
+        )
+
+        for product in drifted_products:
+            self.stdout.write(
+                f'{product.id} {product.name}: '
+                f'is_available={product.is_available}, должно быть {product.actual_is_available}; '
+                f'available_restaurants_count={product.available_restaurants_count}, '
+                f'должно быть {product.actual_available_restaurants_count}'
+            )
+
+        drifted_count = len(drifted_products)
+        if options['check']:
+            if drifted_count:
+                raise CommandError(f'Расхождений: {drifted_count}')
+            self.stdout.write('Расхождений нет')
+            return
+
+        Product.objects.update_availability()
+        invalidate_catalog()
+        self.stdout.write(f'Исправлено товаров: {drifted_count}')
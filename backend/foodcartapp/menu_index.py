@@ -0,0 +1,87 @@
+from uuid import uuid4
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import RestaurantMenuItem
+
+
+MENU_INDEX_VERSION_KEY = 'foodcartapp:menu_index_version'
+
+
+class RestaurantMenuIndex:
+    """Для каждого товара хранит битовую маску ресторанов, где он в продаже."""
+
+    def __init__(self, menu_items, version=None):
+        self.version = version
+        self.restaurant_ids = []
+        self.product_masks = {}
+
+        restaurant_bits = {}
+        for restaurant_id, product_id in menu_items:
+            if restaurant_id not in restaurant_bits:
+                restaurant_bits[restaurant_id] = len(self.restaurant_ids)
+                self.restaurant_ids.append(restaurant_id)
+            bit = 1 << restaurant_bits[restaurant_id]
+            self.product_masks[product_id] = self.product_masks.get(product_id, 0) | bit
+
+        self.all_restaurants_mask = (1 << len(self.restaurant_ids)) - 1
+
+    @classmethod
+    def build(cls, version=None):
+        menu_items = (
+            RestaurantMenuItem.objects
+            .filter(availability=True)
+            .order_by('restaurant_id')
+            .values_list('restaurant_id', 'product_id')
+        )
+        return cls(menu_items, version=version)
+
+    def get_mask(self, product_ids):
+        mask = self.all_restaurants_mask
+        for product_id in product_ids:
+            mask &= self.product_masks.get(product_id, 0)
+            if not mask:
+                break
+        return mask
+
+    def get_restaurant_ids(self, product_ids):
+        mask = self.get_mask(product_ids)
+        restaurant_ids = []
+        while mask:
+            lowest_bit = mask & -mask
+            restaurant_ids.append(self.restaurant_ids[lowest_bit.bit_length() - 1])
+            mask ^= lowest_bit
+        return restaurant_ids
+
+    def get_restaurant_flags(self, product_ids):
+        """То же, что get_restaurant_ids, но массивом флагов в порядке self.restaurant_ids."""
+        mask = self.get_mask(product_ids)
+        mask_bytes = mask.to_bytes((len(self.restaurant_ids) + 7) // 8, 'little')
+        flags = np.unpackbits(np.frombuffer(mask_bytes, dtype=np.uint8), bitorder='little')
+        return flags[:len(self.restaurant_ids)].astype(bool)
+
+
+_menu_index = None
+
+
+def get_menu_index():
+    # Версия лежит в кэше, чтобы при общем кэше индекс пересобирали все воркеры
+    global _menu_index
+    version = cache.get_or_set(MENU_INDEX_VERSION_KEY, lambda: uuid4().hex, timeout=None)
+    if _menu_index is None or _menu_index.version != version:
+        _menu_index = RestaurantMenuIndex.build(version=version)
+    return _menu_index
+
+
+def invalidate_menu_index():
+    cache.set(MENU_INDEX_VERSION_KEY, uuid4().hex, timeout=None)
+
+
+@receiver(post_save, sender=RestaurantMenuItem)
+@receiver(post_delete, sender=RestaurantMenuItem)
+def on_menu_item_change(sender, **kwargs):
+    transaction.on_commit(invalidate_menu_index)
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.25 on 2026-10-18 13:00
+
+import os
+
+from django.contrib.staticfiles import finders
+from django.core.cache import cache
+from django.core.files import File
+from django.db import migrations, models
+
+
+INITIAL_BANNERS = [
+    ('Burger', 'burger.jpg', 'Tasty Burger at your door step'),
+    ('Spices', 'food.jpg', 'All Cuisines'),
+    ('New York', 'tasty.jpg', 'Food is incomplete without a tasty dessert'),
+]
+
+
+def create_initial_banners(apps, schema_editor):
+    # Переносим баннеры, которые раньше были зашиты в banners_list_api
+    Banner = apps.get_model('foodcartapp', 'Banner')
+    for position, (title, image_name, text) in enumerate(INITIAL_BANNERS):
+        image_path = finders.find(image_name)
+        banner = Banner(title=title, text=text, position=position)
+        if not image_path:
+            # Без статики фронтенда баннер всё равно создаём, картинку загрузят в админке
+            print(f'\n  Баннер «{title}»: картинка {image_name} не найдена в STATICFILES_DIRS, загрузите её в админке')
+            banner.image.name = image_name
+            banner.save()
+            continue
+        with open(image_path, 'rb') as image_file:
+            banner.image.save(os.path.basename(image_path), File(image_file), save=True)
+    cache.delete('foodcartapp:banners')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0052_create_cache_table'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Banner',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=50, verbose_name='заголовок')),
+                ('text', models.CharField(blank=True, max_length=200, verbose_name='текст')),
+                ('image', models.ImageField(upload_to='banners', verbose_name='картинка')),
+                ('position', models.PositiveIntegerField(db_index=True, default=0, verbose_name='позиция')),
+                ('is_active', models.BooleanField(default=True, verbose_name='показывать')),
+                ('starts_at', models.DateTimeField(blank=True, null=True, verbose_name='начало показа')),
+                ('ends_at', models.DateTimeField(blank=True, null=True, verbose_name='конец показа')),
+            ],
+            options={
+                'verbose_name': 'баннер',
+                'verbose_name_plural': 'баннеры',
+                'ordering': ['position', 'id'],
+            },
+        ),
+        migrations.RunPython(create_initial_banners, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.25 on 2026-10-18 14:00
+
+from django.db import migrations, models
+from django.db.models import Count, Exists, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_product_availability(apps, schema_editor):
+    Product = apps.get_model('foodcartapp', 'Product')
+    RestaurantMenuItem = apps.get_model('foodcartapp', 'RestaurantMenuItem')
+
+    available_menu_items = RestaurantMenuItem.objects.filter(product=OuterRef('pk'), availability=True)
+    restaurants_count = (
+        available_menu_items
+        .values('product')
+        .annotate(restaurants_count=Count('pk'))
+        .values('restaurants_count')
+    )
+    Product.objects.update(
+        is_available=Exists(available_menu_items),
+        available_restaurants_count=Coalesce(Subquery(restaurants_count), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0053_banner'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='is_available',
+            field=models.BooleanField(db_index=True, default=False, editable=False, verbose_name='есть в ресторанах'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='available_restaurants_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='в скольких ресторанах'),
+        ),
+        migrations.RunPython(fill_product_availability, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.25 on 2026-10-18 18:20
+
+from django.db import migrations, models
+import django.utils.timezone
+import phonenumber_field.modelfields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0058_order_total'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='address',
+            field=models.CharField(max_length=255, verbose_name='адрес доставки'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='called_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='дата звонка'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='delivered_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='дата доставки'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='payment_method',
+            field=models.CharField(choices=[('Cash', 'Наличными'), ('Card', 'Картой'), ('Online', 'Онлайн')], max_length=20, verbose_name='способ оплаты'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='phonenumber',
+            field=phonenumber_field.modelfields.PhoneNumberField(max_length=128, region=None, verbose_name='номер телефона'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='registered_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='дата регистрации'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='status',
+            field=models.CharField(choices=[('Done', 'Выполнен'), ('In delivery', 'На доставке'), ('In progress', 'В процессе'), ('Raw', 'Не обработан')], default='Raw', max_length=20, verbose_name='статус'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status', 'Done'), _negated=True), fields=['status', 'registered_at', 'id'], name='order_active_idx'),
+        ),
+    ]
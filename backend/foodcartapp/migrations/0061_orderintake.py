@@ -0,0 +1,34 @@
+# Generated by Django 4.2.25 on 2026-10-18 19:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0060_product_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderIntake',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('receipt', models.UUIDField(default=uuid.uuid4, editable=False, unique=True, verbose_name='квитанция')),
+                ('payload', models.JSONField(verbose_name='данные заказа')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('created', 'Заказ создан'), ('rejected', 'Отклонён')], default='pending', max_length=20, verbose_name='статус')),
+                ('error', models.TextField(blank=True, verbose_name='ошибка')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='принят')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='обработан')),
+                ('order', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='intake', to='foodcartapp.order', verbose_name='заказ')),
+            ],
+            options={
+                'verbose_name': 'заказ в очереди',
+                'verbose_name_plural': 'очередь заказов',
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['id'], name='order_intake_pending_idx')],
+            },
+        ),
+    ]
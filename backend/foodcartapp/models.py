@@ -1,9 +1,30 @@
+from decimal import Decimal
+from uuid import uuid4
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    SearchVectorField,
+    TrigramWordSimilarity,
+)
 from django.db import models
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator
 from phonenumber_field.modelfields import PhoneNumberField
 from django.utils import timezone
 
-from collections import defaultdict
+
+class RestaurantQuerySet(models.QuerySet):
+    def with_order_stats(self):
+        # Выручка по выполненным заказам и число активных заказов одним запросом
+        return self.annotate(
+            revenue=Coalesce(Sum('orders__total', filter=Q(orders__status='Done')), Value(Decimal(0))),
+            active_orders_count=Count('orders', filter=~Q(orders__status='Done')),
+        )
+
 
 class Restaurant(models.Model):
     name = models.CharField(
@@ -22,6 +43,8 @@ class Restaurant(models.Model):
         blank=True,
     )
 
+    objects = RestaurantQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'ресторан'
         verbose_name_plural = 'рестораны'
@@ -30,14 +53,58 @@ class Restaurant(models.Model):
         return self.name
 
 
+SEARCH_CONFIG = 'russian'
+
+
 class ProductQuerySet(models.QuerySet):
     def available(self):
-        products = (
-            RestaurantMenuItem.objects
-            .filter(availability=True)
-            .values_list('product')
+        return self.filter(is_available=True)
+
+    def get_availability_expressions(self):
+        available_menu_items = RestaurantMenuItem.objects.filter(product=OuterRef('pk'), availability=True)
+        restaurants_count = (
+            available_menu_items
+            .values('product')
+            .annotate(restaurants_count=Count('pk'))
+            .values('restaurants_count')
+        )
+        return {
+            'is_available': Exists(available_menu_items),
+            'available_restaurants_count': Coalesce(Subquery(restaurants_count), 0),
+        }
+
+    def with_actual_availability(self):
+        return self.annotate(**{
+            f'actual_{name}': expression
+            for name, expression in self.get_availability_expressions().items()
+        })
+
+    def update_availability(self):
+        # Пересчёт денормализованных полей одним UPDATE
+        return self.update(**self.get_availability_expressions())
+
+    def get_search_vector_expression(self):
+        category_name = ProductCategory.objects.filter(pk=OuterRef('category')).values('name')
+        return (
+            SearchVector('name', weight='A', config=SEARCH_CONFIG)
+            + SearchVector(Subquery(category_name), weight='B', config=SEARCH_CONFIG)
+            + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+        )
+
+    def update_search_vector(self):
+        return self.update(search_vector=self.get_search_vector_expression())
+
+    def search(self, text):
+        # Полнотекстовый поиск со стеммингом, а триграммы ловят опечатки в названии
+        query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+        return (
+            self.filter(Q(search_vector=query) | Q(name__trigram_word_similar=text))
+            .annotate(
+                rank=SearchRank(F('search_vector'), query),
+                similarity=TrigramWordSimilarity(text, 'name'),
+            )
+            .order_by('-rank', '-similarity', 'id')
         )
-        return self.filter(pk__in=products)
 
 
 class ProductCategory(models.Model):
@@ -86,12 +153,41 @@ class Product(models.Model):
         max_length=200,
         blank=True,
     )
+    # Поддерживаются сигналами из foodcartapp.product_availability
+    is_available = models.BooleanField(
+        'есть в ресторанах',
+        default=False,
+        db_index=True,
+        editable=False,
+    )
+    available_restaurants_count = models.PositiveIntegerField(
+        'в скольких ресторанах',
+        default=0,
+        editable=False,
+    )
+    # Заполняется из foodcartapp.thumbnails: только превью, которые действительно созданы
+    thumbnails = models.JSONField(
+        'готовые превью',
+        default=list,
+        blank=True,
+        editable=False,
+    )
+    # Поддерживается сигналами из foodcartapp.product_search
+    search_vector = SearchVectorField(
+        'поисковый вектор',
+        null=True,
+        editable=False,
+    )
 
     objects = ProductQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'товар'
         verbose_name_plural = 'товары'
+        indexes = [
+            GinIndex(fields=['search_vector'], name='product_search_vector_idx'),
+            GinIndex(fields=['name'], name='product_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
 
     def __str__(self):
         return self.name
@@ -126,25 +222,140 @@ class RestaurantMenuItem(models.Model):
     def __str__(self):
         return f"{self.restaurant.name} - {self.product.name}"
 
+class BannerQuerySet(models.QuerySet):
+    def active(self, now=None):
+        now = now or timezone.now()
+        return (
+            self
+            .filter(is_active=True)
+            .filter(models.Q(starts_at__isnull=True) | models.Q(starts_at__lte=now))
+            .filter(models.Q(ends_at__isnull=True) | models.Q(ends_at__gt=now))
+        )
+
+
+class Banner(models.Model):
+    title = models.CharField(
+        'заголовок',
+        max_length=50,
+    )
+    text = models.CharField(
+        'текст',
+        max_length=200,
+        blank=True,
+    )
+    image = models.ImageField(
+        'картинка',
+        upload_to='banners',
+    )
+    position = models.PositiveIntegerField(
+        'позиция',
+        default=0,
+        db_index=True,
+    )
+    is_active = models.BooleanField(
+        'показывать',
+        default=True,
+    )
+    starts_at = models.DateTimeField(
+        'начало показа',
+        null=True,
+        blank=True,
+    )
+    ends_at = models.DateTimeField(
+        'конец показа',
+        null=True,
+        blank=True,
+    )
+
+    objects = BannerQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'баннер'
+        verbose_name_plural = 'баннеры'
+        ordering = ['position', 'id']
+
+    def __str__(self):
+        return self.title
+
+
 class OrderQuerySet(models.QuerySet):
     def with_available_restaurants(self):
+        from .menu_index import get_menu_index
 
-        restaurant_menu_items = RestaurantMenuItem.objects.select_related('restaurant', 'product')
-
-        menu_by_restaurant = defaultdict(set)
-        for item in restaurant_menu_items:
-            menu_by_restaurant[item.restaurant].add(item.product)
+        menu_index = get_menu_index()
+        restaurants = Restaurant.objects.in_bulk(menu_index.restaurant_ids)
 
         for order in self:
-            order_products = set(item.product for item in order.items.all())
-            available_restaurants = [
-                restaurant for restaurant, products in menu_by_restaurant.items()
-                if order_products.issubset(products)
+            order_product_ids = {item.product_id for item in order.items.all()}
+            order.restaurants = [
+                restaurants[restaurant_id]
+                for restaurant_id in menu_index.get_restaurant_ids(order_product_ids)
+                if restaurant_id in restaurants
             ]
-            order.restaurants = available_restaurants
 
         return self
 
+    def after_position(self, status, registered_at, order_id):
+        # Keyset-пагинация по (status, registered_at, id), без OFFSET
+        return self.filter(
+            Q(status__gt=status)
+            | Q(status=status, registered_at__gt=registered_at)
+            | Q(status=status, registered_at=registered_at, id__gt=order_id)
+        )
+
+    def up_to_position(self, status, registered_at, order_id):
+        # Верхняя граница страницы, заказ на позиции входит в выборку
+        return self.filter(
+            Q(status__lt=status)
+            | Q(status=status, registered_at__lt=registered_at)
+            | Q(status=status, registered_at=registered_at, id__lte=order_id)
+        )
+
+    def with_total(self):
+        # Подзапрос, а не JOIN с GROUP BY: иначе сортировка по индексу и LIMIT
+        # перестают работать и база группирует все подходящие заказы
+        return self.annotate(total_price=self.get_total_expression())
+
+    def get_total_expression(self):
+        items_total = (
+            OrderItem.objects
+            .filter(order=OuterRef('pk'))
+            .values('order')
+            .annotate(total=Sum(F('price') * F('quantity')))
+            .values('total')
+        )
+        return Coalesce(Subquery(items_total), Value(Decimal(0)))
+
+    def update_totals(self):
+        # update() не трогает auto_now, а смена суммы — тоже изменение заказа
+        return self.update(total=self.get_total_expression(), updated_at=timezone.now())
+
+    def changed_after(self, updated_at, order_id):
+        # Keyset по (updated_at, id) для ленты изменений
+        return self.filter(
+            Q(updated_at__gt=updated_at)
+            | Q(updated_at=updated_at, id__gt=order_id)
+        )
+
+    def available_restaurant_pairs(self):
+        order_products_count = (
+            OrderItem.objects
+            .filter(order=OuterRef('order'))
+            .values('order')
+            .annotate(products_count=Count('product', distinct=True))
+            .values('products_count')
+        )
+        return (
+            OrderItem.objects
+            .filter(order__in=self.values('pk'), product__menu_items__availability=True)
+            .values('order', restaurant=F('product__menu_items__restaurant'))
+            .annotate(matched_count=Count('product', distinct=True))
+            .filter(matched_count=Subquery(order_products_count))
+            .values_list('order', 'restaurant')
+            .order_by('order', 'restaurant')
+        )
+
+
 class Order(models.Model):
     ORDER_STATUS = {
         ('Done', 'Выполнен'),
@@ -164,7 +375,6 @@ class Order(models.Model):
         max_length=20,
         choices=ORDER_STATUS,
         default='Raw',
-        db_index=True,
     )
     products = models.ManyToManyField(
         Product,
@@ -181,27 +391,26 @@ class Order(models.Model):
     )
     phonenumber = PhoneNumberField(
         'номер телефона',
-        db_index=True,
     )
     address = models.CharField(
         'адрес доставки',
         max_length=255,
-        db_index=True,
     )
     registered_at = models.DateTimeField(
         'дата регистрации',
-        db_index=True,
         default=timezone.now,
     )
+    updated_at = models.DateTimeField(
+        'дата изменения',
+        auto_now=True,
+    )
     called_at = models.DateTimeField(
         'дата звонка',
-        db_index=True,
         null=True,
         blank=True,
     )
     delivered_at = models.DateTimeField(
         'дата доставки',
-        db_index=True,
         null=True,
         blank=True,
     )
@@ -209,12 +418,18 @@ class Order(models.Model):
         'способ оплаты',
         max_length=20,
         choices=PAY_METHODS,
-        db_index=True,
     )
     comment = models.TextField(
         'комментарий',
         blank=True,
     )
+    total = models.DecimalField(
+        'стоимость',
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        editable=False,
+    )
     restaurant = models.ForeignKey(
         Restaurant,
         related_name='orders',
@@ -229,6 +444,17 @@ class Order(models.Model):
     class Meta:
         verbose_name = 'заказ'
         verbose_name_plural = 'заказы'
+        indexes = [
+            models.Index(fields=['status', 'registered_at', 'id'], name='order_status_registered_idx'),
+            # Выполненные заказы — почти вся таблица; без частичного индекса
+            # exclude(status='Done') с сортировкой по статусу читает их все
+            models.Index(
+                fields=['status', 'registered_at', 'id'],
+                name='order_active_idx',
+                condition=~Q(status='Done'),
+            ),
+            models.Index(fields=['updated_at', 'id'], name='order_updated_idx'),
+        ]
 
     def __str__(self):
         return f'Заказ №{self.id} ({self.address})'
@@ -266,3 +492,61 @@ class OrderItem(models.Model):
 
     def __str__(self):
         return f'{self.product.name} × {self.quantity}'
+
+
+class OrderIntake(models.Model):
+    PENDING = 'pending'
+    CREATED = 'created'
+    REJECTED = 'rejected'
+    STATUSES = [
+        (PENDING, 'В очереди'),
+        (CREATED, 'Заказ создан'),
+        (REJECTED, 'Отклонён'),
+    ]
+
+    receipt = models.UUIDField(
+        'квитанция',
+        default=uuid4,
+        unique=True,
+        editable=False,
+    )
+    payload = models.JSONField(
+        'данные заказа',
+    )
+    status = models.CharField(
+        'статус',
+        max_length=20,
+        choices=STATUSES,
+        default=PENDING,
+    )
+    order = models.OneToOneField(
+        Order,
+        related_name='intake',
+        verbose_name='заказ',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+    error = models.TextField(
+        'ошибка',
+        blank=True,
+    )
+    created_at = models.DateTimeField(
+        'принят',
+        default=timezone.now,
+    )
+    processed_at = models.DateTimeField(
+        'обработан',
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        verbose_name = 'заказ в очереди'
+        verbose_name_plural = 'очередь заказов'
+        indexes = [
+            models.Index(fields=['id'], name='order_intake_pending_idx', condition=Q(status='pending')),
+        ]
+
+    def __str__(self):
+        return f'Квитанция {self.receipt}'
@@ -0,0 +1,54 @@
+import json
+from datetime import datetime
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from .models import Order, OrderItem
+
+
+ORDERS_CHANGED_AT_KEY = 'foodcartapp:orders_changed_at'
+
+
+def get_orders_changed_at():
+    return cache.get(ORDERS_CHANGED_AT_KEY)
+
+
+def mark_orders_changed():
+    # Метка позволяет ответить «изменений нет», не заглядывая в таблицу заказов
+    cache.set(ORDERS_CHANGED_AT_KEY, timezone.now(), timeout=None)
+
+
+def encode_changes_cursor(updated_at, order_id):
+    position = [updated_at.isoformat(), order_id]
+    return urlsafe_base64_encode(json.dumps(position).encode())
+
+
+def decode_changes_cursor(cursor):
+    try:
+        updated_at, order_id = json.loads(urlsafe_base64_decode(cursor))
+        updated_at = datetime.fromisoformat(updated_at)
+        order_id = int(order_id)
+    except (TypeError, ValueError):
+        return None
+    # Курсоры выдаёт сервер, в них всегда есть часовой пояс; наивную дату не с чем сравнить
+    if timezone.is_naive(updated_at):
+        return None
+    return updated_at, order_id
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def on_order_change(sender, **kwargs):
+    transaction.on_commit(mark_orders_changed)
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def on_order_item_change(sender, instance, **kwargs):
+    Order.objects.filter(pk=instance.order_id).update_totals()
+    transaction.on_commit(mark_orders_changed)
@@ -0,0 +1,84 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Order, OrderIntake, OrderItem, Product
+from .order_changes import mark_orders_changed
+
+
+def build_order(order_data):
+    order_data = dict(order_data)
+    order_items = [
+        OrderItem(product=item['product'], quantity=item['quantity'], price=item['product'].price)
+        for item in order_data.pop('products')
+    ]
+    # Сумма на момент оформления, по ценам, записанным в позиции
+    total = sum(item.price * item.quantity for item in order_items)
+    return Order(**order_data, total=total), order_items
+
+
+def enqueue_order(order_data):
+    payload = {field: str(value) for field, value in order_data.items() if field != 'products'}
+    payload['products'] = [
+        {'product': item['product'].id, 'quantity': item['quantity']}
+        for item in order_data['products']
+    ]
+    return OrderIntake.objects.create(payload=payload)
+
+
+def get_intake_order_data(intake, products):
+    order_data = dict(intake.payload)
+    order_data['products'] = [
+        {'product': products[item['product']], 'quantity': item['quantity']}
+        for item in intake.payload['products']
+    ]
+    return order_data
+
+
+def process_intake_batch(batch_size):
+    """Создаёт заказы из очереди пачкой и возвращает число обработанных квитанций."""
+    with transaction.atomic():
+        # skip_locked позволяет запускать несколько обработчиков одновременно
+        intakes = list(
+            OrderIntake.objects
+            .filter(status=OrderIntake.PENDING)
+            .select_for_update(skip_locked=True)
+            .order_by('id')[:batch_size]
+        )
+        if not intakes:
+            return 0
+
+        product_ids = {
+            item['product']
+            for intake in intakes
+            for item in intake.payload['products']
+        }
+        products = Product.objects.in_bulk(product_ids)
+
+        accepted = []
+        for intake in intakes:
+            intake.processed_at = timezone.now()
+            missing_ids = sorted(
+                {item['product'] for item in intake.payload['products']} - products.keys()
+            )
+            if missing_ids:
+                # Товар удалили, пока заказ ждал в очереди
+                intake.status = OrderIntake.REJECTED
+                intake.error = f'Invalid product ids: {missing_ids}'
+                continue
+            intake.status = OrderIntake.CREATED
+            accepted.append((intake, *build_order(get_intake_order_data(intake, products))))
+
+        orders = Order.objects.bulk_create([order for _, order, _ in accepted])
+        all_items = []
+        for (intake, _, order_items), order in zip(accepted, orders):
+            intake.order = order
+            for item in order_items:
+                item.order = order
+            all_items.extend(order_items)
+        OrderItem.objects.bulk_create(all_items)
+        OrderIntake.objects.bulk_update(intakes, ['status', 'order', 'error', 'processed_at'])
+
+        if accepted:
+            transaction.on_commit(mark_orders_changed)
+
+    return len(intakes)
@@ -0,0 +1,30 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Product, RestaurantMenuItem
+
+
+@receiver(pre_save, sender=RestaurantMenuItem)
+def remember_previous_product(sender, instance, **kwargs):
+    # Позицию меню могут перепривязать к другому товару, его тоже надо пересчитать
+    instance.previous_product_id = None
+    if instance.pk:
+        instance.previous_product_id = (
+            RestaurantMenuItem.objects
+            .filter(pk=instance.pk)
+            .values_list('product_id', flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=RestaurantMenuItem)
+@receiver(post_delete, sender=RestaurantMenuItem)
+def on_menu_item_change(sender, instance, **kwargs):
+    product_ids = {instance.product_id, getattr(instance, 'previous_product_id', None)} - {None}
+    Product.objects.filter(pk__in=product_ids).update_availability()
+
+
+@receiver(post_save, sender=Product)
+def on_product_save(sender, instance, **kwargs):
+    # save() устаревшего экземпляра перезаписал бы флаги, пересчитываем их по меню
+    Product.objects.filter(pk=instance.pk).update_availability()
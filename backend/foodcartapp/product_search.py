@@ -0,0 +1,15 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Product, ProductCategory
+
+
+@receiver(post_save, sender=Product)
+def on_product_save(sender, instance, **kwargs):
+    Product.objects.filter(pk=instance.pk).update_search_vector()
+
+
+@receiver(post_save, sender=ProductCategory)
+def on_category_save(sender, instance, **kwargs):
+    # Название категории входит в вектор всех её товаров
+    instance.products.update_search_vector()
@@ -1,10 +1,13 @@
-from rest_framework.serializers import ModelSerializer, ValidationError
+from rest_framework.serializers import IntegerField, ModelSerializer, ValidationError
 from phonenumber_field.validators import validate_international_phonenumber
 
-from .models import Order, OrderItem
+from .models import Order, OrderItem, Product
 
 
 class OrderItemSerializer(ModelSerializer):
+    # Товары подтягиваются одним запросом в OrderSerializer.validate_products
+    product = IntegerField(min_value=1)
+
     class Meta:
         model = OrderItem
         fields = ['product', 'quantity']
@@ -15,7 +18,10 @@ class OrderSerializer(ModelSerializer):
 
     class Meta:
         model = Order
-        fields = ['products', 'firstname', 'lastname', 'phonenumber', 'address']
+        fields = ['products', 'firstname', 'lastname', 'phonenumber', 'address', 'payment_method', 'comment']
+        extra_kwargs = {
+            'payment_method': {'required': False},
+        }
 
     def validate_phonenumber(self, value):
         try:
@@ -23,3 +29,36 @@ class OrderSerializer(ModelSerializer):
         except ValidationError:
             raise ValidationError("Invalid phone number format")
         return value
+
+    def validate_products(self, items):
+        product_ids = {item['product'] for item in items}
+        # Пакетная загрузка заказов передаёт товары, найденные заранее одним запросом
+        products = self.context.get('products')
+        if products is None:
+            products = Product.objects.in_bulk(product_ids)
+
+        missing_ids = sorted(product_ids - products.keys())
+        if missing_ids:
+            raise ValidationError(f"Invalid product ids: {missing_ids}")
+
+        for item in items:
+            item['product'] = products[item['product']]
+        return items
+
+
+class OrderChangeItemSerializer(ModelSerializer):
+    class Meta:
+        model = OrderItem
+        fields = ['product', 'quantity', 'price']
+
+
+class OrderChangeSerializer(ModelSerializer):
+    items = OrderChangeItemSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Order
+        fields = [
+            'id', 'status', 'firstname', 'lastname', 'phonenumber', 'address', 'payment_method',
+            'comment', 'total', 'restaurant', 'registered_at', 'called_at', 'delivered_at', 'updated_at', 'items',
+        ]
+        read_only_fields = fields
@@ -0,0 +1,237 @@
+import json
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.http import urlsafe_base64_encode
+from PIL import Image
+
+from star_burger.renderers import prettify
+from .catalog import CATALOG_CACHE_KEY, dump_catalog, get_catalog_version, invalidate_catalog
+from .models import Order, OrderItem, Product, Restaurant, RestaurantMenuItem
+from .thumbnails import get_srcsets, get_thumbnail_name, get_thumbnail_url
+
+
+class ProductAvailabilityTest(TestCase):
+    def test_stale_product_save_keeps_availability(self):
+        product = Product.objects.create(name='Чизбургер', price=100, image='cheeseburger.jpg')
+        restaurant = Restaurant.objects.create(name='Star Burger', address='Тверская, 1')
+        menu_item = RestaurantMenuItem.objects.create(restaurant=restaurant, product=product)
+        stale_product = Product.objects.get(pk=product.pk)
+        self.assertTrue(stale_product.is_available)
+
+        menu_item.availability = False
+        menu_item.save()
+        stale_product.description = 'С сыром'
+        stale_product.save()
+
+        product.refresh_from_db()
+        self.assertFalse(product.is_available)
+        self.assertEqual(product.available_restaurants_count, 0)
+        self.assertFalse(Product.objects.available().exists())
+
+
+class ThumbnailNameTest(TestCase):
+    def test_images_with_one_stem_get_different_thumbnails(self):
+        for webp in (False, True):
+            self.assertNotEqual(
+                get_thumbnail_name('burger.png', 100, webp=webp),
+                get_thumbnail_name('burger.jpg', 100, webp=webp),
+            )
+        self.assertEqual(get_thumbnail_name('burger.jpg', 100, webp=True), 'thumbnails/burger.jpg_100w.webp')
+
+    @mock.patch('foodcartapp.thumbnails.default_storage.exists', side_effect=AssertionError('storage access'))
+    def test_thumbnail_urls_do_not_touch_storage(self, exists):
+        product = Product(
+            name='Чизбургер', price=100, image='burger.jpg',
+            thumbnails=['thumbnails/burger.jpg_100w.jpg', 'thumbnails/burger.jpg_300w.webp'],
+        )
+
+        srcsets = get_srcsets(product)
+        url = get_thumbnail_url(product, 100)
+
+        self.assertEqual(srcsets['image_webp_srcset'], '/media/thumbnails/burger.jpg_300w.webp 300w')
+        self.assertEqual(srcsets['image_srcset'], '/media/thumbnails/burger.jpg_100w.jpg 100w')
+        self.assertEqual(url, '/media/thumbnails/burger.jpg_100w.jpg')
+        exists.assert_not_called()
+
+    def test_missing_thumbnails_fall_back_to_image(self):
+        product = Product(name='Чизбургер', price=100, image='burger.jpg')
+
+        self.assertEqual(get_thumbnail_url(product, 300), product.image.url)
+        self.assertEqual(get_srcsets(product), {'image_srcset': '', 'image_webp_srcset': ''})
+
+
+class ThumbnailCreationTest(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.settings_override = override_settings(MEDIA_ROOT=media_root, THUMBNAIL_WIDTHS=[100, 300])
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def test_saved_product_records_created_thumbnails(self):
+        buffer = BytesIO()
+        Image.new('RGB', (400, 300), 'red').save(buffer, 'JPEG')
+        image_name = default_storage.save('burger.jpg', ContentFile(buffer.getvalue()))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(name='Чизбургер', price=100, image=image_name)
+
+        product.refresh_from_db()
+        self.assertEqual(product.thumbnails, sorted(
+            get_thumbnail_name(image_name, width, webp=webp) for width in (100, 300) for webp in (False, True)
+        ))
+        self.assertTrue(all(default_storage.exists(name) for name in product.thumbnails))
+
+    def test_unreadable_image_records_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(name='Чизбургер', price=100, image='missing.jpg')
+
+        product.refresh_from_db()
+        self.assertEqual(product.thumbnails, [])
+        self.assertEqual(get_thumbnail_url(product, 100), product.image.url)
+
+
+class AvailableRestaurantsTest(TestCase):
+    def setUp(self):
+        products = [
+            Product.objects.create(name=name, price=100, image=f'{name}.jpg')
+            for name in ('Чизбургер', 'Картофель фри', 'Молочный коктейль', 'Салат')
+        ]
+        self.cheeseburger, self.fries, self.shake, self.salad = products
+        restaurants = [
+            Restaurant.objects.create(name=name, address=f'{name}, 1')
+            for name in ('Тверская', 'Арбат', 'Сретенка')
+        ]
+        menu = {
+            restaurants[0]: {self.cheeseburger: True, self.fries: True},
+            restaurants[1]: {self.cheeseburger: True, self.fries: False, self.shake: True},
+            restaurants[2]: {self.cheeseburger: True, self.fries: True, self.shake: True, self.salad: False},
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            for restaurant, items in menu.items():
+                for product, availability in items.items():
+                    RestaurantMenuItem.objects.create(restaurant=restaurant, product=product, availability=availability)
+
+    def create_order(self, *products):
+        order = Order.objects.create(firstname='Иван', lastname='Петров', phonenumber='+79291000000', address='Тверская, 5')
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=product, quantity=1, price=product.price)
+            for product in products
+        ])
+        return order
+
+    def test_pairs_match_available_restaurants(self):
+        self.create_order(self.cheeseburger, self.fries)
+        self.create_order(self.cheeseburger, self.cheeseburger)
+        self.create_order(self.fries, self.shake, self.fries)
+        self.create_order(self.shake)
+        self.create_order(self.salad)
+        self.create_order(self.cheeseburger, self.salad)
+
+        orders = Order.objects.prefetch_related('items').with_available_restaurants()
+        expected_pairs = [
+            (order.id, restaurant.id)
+            for order in orders
+            for restaurant in order.restaurants
+        ]
+
+        self.assertEqual(sorted(Order.objects.available_restaurant_pairs()), sorted(expected_pairs))
+        self.assertEqual(len(expected_pairs), 2 + 3 + 1 + 2)
+
+
+@override_settings(ORDER_INTAKE_QUEUE=False)
+class RegisterOrderTest(TestCase):
+    def test_cart_is_saved_with_constant_number_of_queries(self):
+        products = Product.objects.bulk_create([
+            Product(name=f'Бургер {number}', price=100 + number, image='burger.jpg')
+            for number in range(15)
+        ])
+        cart = {
+            'products': [{'product': product.id, 'quantity': 2} for product in products],
+            'firstname': 'Иван',
+            'lastname': 'Петров',
+            'phonenumber': '+79291000000',
+            'address': 'Тверская, 1',
+            'payment_method': 'Card',
+            'comment': 'Позвонить за час',
+        }
+
+        # Товары одним SELECT, заказ и позиции двумя INSERT, плюс SAVEPOINT и RELEASE от atomic
+        with self.assertNumQueries(5):
+            response = self.client.post(reverse('register_order'), cart, content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        order = Order.objects.get()
+        self.assertEqual(order.payment_method, 'Card')
+        self.assertEqual(order.comment, 'Позвонить за час')
+        self.assertEqual(order.items.count(), 15)
+        self.assertEqual(order.total, sum(2 * product.price for product in products))
+
+
+@override_settings(CATALOG_STREAMING=False)
+class ProductListTest(TestCase):
+    def test_warm_catalog_reads_cache_twice(self):
+        self.client.get('/api/products/')
+
+        # Версия каталога и сам каталог, по одному чтению из кэша
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/products/')
+
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=response.headers['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_invalidation_removes_previous_payload(self):
+        self.client.get('/api/products/')
+        payload_key = CATALOG_CACHE_KEY.format(etag=get_catalog_version()['etag'])
+        self.assertIsNotNone(cache.get(payload_key))
+
+        invalidate_catalog()
+
+        self.assertIsNone(cache.get(payload_key))
+
+    def test_pretty_catalog_has_own_etag(self):
+        compact = self.client.get('/api/products/')
+        pretty = self.client.get('/api/products/', {'pretty': '1'})
+
+        self.assertNotEqual(compact.headers['ETag'], pretty.headers['ETag'])
+        response = self.client.get('/api/products/', {'pretty': '1'}, HTTP_IF_NONE_MATCH=compact.headers['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_pretty_banners_have_own_etag(self):
+        compact = self.client.get('/api/banners/')
+        pretty = self.client.get('/api/banners/', {'pretty': '1'})
+
+        self.assertNotEqual(compact.headers['ETag'], pretty.headers['ETag'])
+
+    @override_settings(CATALOG_STREAMING=True)
+    def test_streamed_catalog_matches_cached_one(self):
+        restaurant = Restaurant.objects.create(name='Star Burger', address='Тверская, 1')
+        for name in ('Чизбургер', 'Картофель фри'):
+            product = Product.objects.create(name=name, price=100, image='burger.jpg')
+            RestaurantMenuItem.objects.create(restaurant=restaurant, product=product)
+
+        for params, expected in (({}, dump_catalog()), ({'pretty': '1'}, prettify(dump_catalog()))):
+            with self.subTest(params=params):
+                response = self.client.get('/api/products/', params)
+                self.assertEqual(b''.join(response.streaming_content), expected)
+
+
+class OrderChangesTest(TestCase):
+    def test_naive_cursor_is_rejected(self):
+        self.client.force_login(User.objects.create_user('manager', is_staff=True))
+        cursor = urlsafe_base64_encode(json.dumps(['2026-01-01T00:00:00', 0]).encode())
+
+        response = self.client.get('/api/orders/changes/', {'since': cursor})
+
+        self.assertEqual(response.status_code, 400)
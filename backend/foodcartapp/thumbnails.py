@@ -0,0 +1,124 @@
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from PIL import Image
+
+from .models import Product
+
+
+logger = logging.getLogger(__name__)
+
+THUMBNAILS_DIR = 'thumbnails'
+
+
+def get_thumbnail_name(image_name, width, webp=False):
+    # Исходное расширение остаётся в имени: burger.png и burger.jpg не должны делить превью
+    extension = os.path.splitext(image_name)[1].lower()
+    if webp:
+        extension = '.webp'
+    elif extension != '.png':
+        extension = '.jpg'
+    return os.path.join(THUMBNAILS_DIR, f'{image_name}_{width}w{extension}')
+
+
+def save_thumbnail(image, name, width):
+    thumbnail = image.copy()
+    if thumbnail.width > width:
+        thumbnail.thumbnail((width, thumbnail.height), Image.LANCZOS)
+
+    if name.endswith('.webp'):
+        image_format, options = 'WEBP', {'quality': 80, 'method': 4}
+    elif name.endswith('.png'):
+        image_format, options = 'PNG', {'optimize': True}
+    else:
+        image_format, options = 'JPEG', {'quality': 85, 'optimize': True, 'progressive': True}
+        thumbnail = thumbnail.convert('RGB')
+
+    buffer = BytesIO()
+    thumbnail.save(buffer, image_format, **options)
+    default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def get_thumbnail_names(image_name):
+    return {
+        (width, webp): get_thumbnail_name(image_name, width, webp=webp)
+        for width in settings.THUMBNAIL_WIDTHS
+        for webp in (False, True)
+    }
+
+
+def create_thumbnails(image_field):
+    """Создаёт уменьшенные копии картинки и WebP-версии, уже готовые пропускает.
+
+    Возвращает имена готовых превью; если картинку не открыть, только созданных раньше.
+    """
+    if not image_field:
+        return []
+
+    names = get_thumbnail_names(image_field.name)
+    ready_names = [name for name in names.values() if default_storage.exists(name)]
+    missing = {key: name for key, name in names.items() if name not in ready_names}
+    if not missing:
+        return sorted(ready_names)
+
+    try:
+        with image_field.storage.open(image_field.name, 'rb') as image_file:
+            image = Image.open(image_file)
+            image.load()
+        for (width, _), name in missing.items():
+            save_thumbnail(image, name, width)
+            ready_names.append(name)
+    except (OSError, ValueError) as exc:
+        logger.warning('Не удалось создать превью для %s: %s', image_field.name, exc)
+    return sorted(ready_names)
+
+
+def update_thumbnails(product):
+    thumbnails = create_thumbnails(product.image)
+    if thumbnails != product.thumbnails:
+        product.thumbnails = thumbnails
+        product.save(update_fields=['thumbnails'])
+    return thumbnails
+
+
+# Чтение не обращается к хранилищу: что готово, записано в product.thumbnails,
+# для остального отдаём исходную картинку
+def get_thumbnail_url(product, width):
+    if not product.image:
+        return ''
+    name = get_thumbnail_name(product.image.name, width)
+    if name not in product.thumbnails:
+        return product.image.url
+    return default_storage.url(name)
+
+
+def get_srcsets(product):
+    srcsets = {'image_srcset': '', 'image_webp_srcset': ''}
+    if not product.image:
+        return srcsets
+
+    ready_names = set(product.thumbnails)
+    for webp, key in ((False, 'image_srcset'), (True, 'image_webp_srcset')):
+        entries = []
+        for width in settings.THUMBNAIL_WIDTHS:
+            name = get_thumbnail_name(product.image.name, width, webp=webp)
+            if name in ready_names:
+                entries.append(f'{default_storage.url(name)} {width}w')
+        srcsets[key] = ', '.join(entries)
+    return srcsets
+
+
+@receiver(post_save, sender=Product)
+def on_product_save(sender, instance, update_fields=None, **kwargs):
+    # Своё же сохранение списка превью не обрабатываем повторно
+    if update_fields is not None and set(update_fields) == {'thumbnails'}:
+        return
+    # Готовим превью сразу после загрузки, чтобы первый запрос каталога не ждал
+    transaction.on_commit(lambda: update_thumbnails(instance))
@@ -1,66 +1,120 @@
-from django.http import JsonResponse
-from django.templatetags.static import static
+from datetime import timedelta
 
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils import timezone
+from django.utils.http import http_date
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 
-from .models import Product, Order, OrderItem
-from rest_framework.decorators import api_view
+from .banners import get_banners
+from .catalog import get_catalog_payload, get_catalog_version, iter_catalog, serialize_product
+from .models import Product, Order, OrderIntake, OrderItem
+from .order_intake import build_order, enqueue_order
+from .order_changes import (
+    decode_changes_cursor,
+    encode_changes_cursor,
+    get_orders_changed_at,
+    mark_orders_changed,
+)
+from rest_framework import status
+from rest_framework.decorators import api_view, parser_classes, permission_classes
+from rest_framework.parsers import JSONParser
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 
 from django.db import transaction
-from .serializers import OrderSerializer
+from .parsers import NDJSONParser
+from .serializers import OrderChangeSerializer, OrderSerializer
+from star_burger.renderers import prettify, wants_pretty
 
+
+def get_request_catalog_version(request):
+    # Версию спрашивают ETag, Last-Modified и сама выдача, из кэша читаем её один раз
+    if not hasattr(request, 'catalog_version'):
+        request.catalog_version = get_catalog_version()
+    return request.catalog_version
+
+
+def get_body_etag(etag, request):
+    # Отформатированный ответ отличается от компактного, у него должен быть свой ETag
+    if wants_pretty(request):
+        return f'{etag}-pretty'
+    return etag
+
+
+def get_catalog_etag(request):
+    return get_body_etag(get_request_catalog_version(request)['etag'], request)
+
+
+def get_catalog_last_modified(request):
+    return get_request_catalog_version(request)['modified_at']
+
+
+@cache_control(no_cache=True)
 def banners_list_api(request):
-    # FIXME move data to db?
-    return JsonResponse([
-        {
-            'title': 'Burger',
-            'src': static('burger.jpg'),
-            'text': 'Tasty Burger at your door step',
-        },
-        {
-            'title': 'Spices',
-            'src': static('food.jpg'),
-            'text': 'All Cuisines',
-        },
-        {
-            'title': 'New York',
-            'src': static('tasty.jpg'),
-            'text': 'Food is incomplete without a tasty dessert',
-        }
-    ], safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
+    banners = get_banners()
+    etag = quote_etag(get_body_etag(banners['etag'], request))
+    last_modified = int(banners['modified_at'].timestamp())
 
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        payload = banners['payload']
+        if wants_pretty(request):
+            payload = prettify(payload)
+        response = HttpResponse(payload, content_type='application/json')
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(last_modified)
+    return response
 
+
+@cache_control(no_cache=True)
+@condition(etag_func=get_catalog_etag, last_modified_func=get_catalog_last_modified)
 def product_list_api(request):
-    products = Product.objects.select_related('category').available()
-
-    dumped_products = []
-    for product in products:
-        dumped_product = {
-            'id': product.id,
-            'name': product.name,
-            'price': product.price,
-            'special_status': product.special_status,
-            'description': product.description,
-            'category': {
-                'id': product.category.id,
-                'name': product.category.name,
-            } if product.category else None,
-            'image': product.image.url,
-            'restaurant': {
-                'id': product.id,
-                'name': product.name,
-            }
-        }
-        dumped_products.append(dumped_product)
-    return JsonResponse(dumped_products, safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
+    if settings.CATALOG_STREAMING:
+        return StreamingHttpResponse(
+            iter_catalog(chunk_size=settings.CATALOG_STREAMING_CHUNK_SIZE, pretty=wants_pretty(request)),
+            content_type='application/json',
+        )
+
+    payload = get_catalog_payload(get_request_catalog_version(request))
+    if wants_pretty(request):
+        payload = prettify(payload)
+    return HttpResponse(payload, content_type='application/json')
+
+
+@api_view(['GET'])
+def product_search_api(request):
+    text = request.query_params.get('q', '').strip()
+    if not text:
+        return Response({'detail': 'Query parameter q is required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    products = (
+        Product.objects
+        .available()
+        .select_related('category')
+        .search(text)[:settings.PRODUCT_SEARCH_LIMIT]
+    )
+    return Response([serialize_product(product) for product in products])
+
+
+def get_raw_product_ids(raw_orders):
+    product_ids = set()
+    for raw_order in raw_orders:
+        if not isinstance(raw_order, dict) or not isinstance(raw_order.get('products'), list):
+            continue
+        for raw_item in raw_order['products']:
+            if not isinstance(raw_item, dict):
+                continue
+            try:
+                product_ids.add(int(raw_item.get('product')))
+            except (TypeError, ValueError):
+                continue
+    return product_ids
+
 
-        
 @transaction.atomic
 @api_view(['POST'])
 def register_order(request):
@@ -68,22 +122,110 @@ def register_order(request):
     serializer = OrderSerializer(data=request.data)
 
     serializer.is_valid(raise_exception=True)
-    order_data = serializer.validated_data
-  
-
-    order = Order.objects.create(
-        firstname=order_data['firstname'],
-        lastname=order_data['lastname'],
-        phonenumber=order_data['phonenumber'],
-        address=order_data['address'],
-    )
+    if settings.ORDER_INTAKE_QUEUE:
+        # Заказ создаст обработчик process_order_intake, клиент получает квитанцию
+        intake = enqueue_order(serializer.validated_data)
+        return Response(
+            {'receipt': intake.receipt, 'status': intake.status},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+    order, order_items = build_order(serializer.validated_data)
+    order.save()
 
-    for item in order_data['products']:
-        product = item['product']
-        OrderItem.objects.create(order=order, product=product, quantity=item['quantity'], price=product.price)
+    for item in order_items:
+        item.order = order
+    OrderItem.objects.bulk_create(order_items)
 
     return Response(OrderSerializer(order).data)
 
 
+@api_view(['POST'])
+@parser_classes([JSONParser, NDJSONParser])
+def register_orders_batch(request):
+    raw_orders = request.data
+    if not isinstance(raw_orders, list):
+        return Response({'detail': 'Expected a list of orders.'}, status=status.HTTP_400_BAD_REQUEST)
+    if not raw_orders:
+        return Response({'detail': 'Batch is empty.'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(raw_orders) > settings.ORDER_BATCH_MAX_SIZE:
+        return Response(
+            {'detail': f'Batch size exceeds {settings.ORDER_BATCH_MAX_SIZE} orders.'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
 
-    
+    products = Product.objects.in_bulk(get_raw_product_ids(raw_orders))
+
+    results = []
+    valid_orders = []
+    for index, raw_order in enumerate(raw_orders):
+        serializer = OrderSerializer(data=raw_order, context={'products': products})
+        if not serializer.is_valid():
+            results.append({'index': index, 'status': 'rejected', 'errors': serializer.errors})
+            continue
+        result = {'index': index, 'status': 'created'}
+        results.append(result)
+        valid_orders.append((result, *build_order(serializer.validated_data)))
+
+    with transaction.atomic():
+        orders = Order.objects.bulk_create([order for _, order, _ in valid_orders])
+        all_items = []
+        for (result, _, order_items), order in zip(valid_orders, orders):
+            result['id'] = order.id
+            for item in order_items:
+                item.order = order
+            all_items.extend(order_items)
+        OrderItem.objects.bulk_create(all_items)
+        # bulk_create не отправляет post_save, отмечаем изменение заказов сами
+        transaction.on_commit(mark_orders_changed)
+
+    return Response({
+        'created': len(valid_orders),
+        'rejected': len(raw_orders) - len(valid_orders),
+        'results': results,
+    })
+
+
+@api_view(['GET'])
+def order_intake_status_api(request, receipt):
+    intake = get_object_or_404(OrderIntake, receipt=receipt)
+    return Response({
+        'receipt': intake.receipt,
+        'status': intake.status,
+        'order': intake.order_id,
+        'error': intake.error or None,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def order_changes_api(request):
+    since = request.query_params.get('since')
+    position = None
+    if since:
+        position = decode_changes_cursor(since)
+        if position is None:
+            return Response({'detail': 'Invalid cursor.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Заказы не менялись после курсора: отвечаем без запросов к заказам
+        orders_changed_at = get_orders_changed_at()
+        if orders_changed_at is not None and orders_changed_at <= position[0]:
+            return Response({'results': [], 'cursor': since, 'has_more': False})
+
+    # updated_at проставляется до коммита, поэтому самые свежие изменения отдаём
+    # с задержкой, иначе курсор может обогнать ещё не закоммиченный заказ
+    settled_at = timezone.now() - timedelta(seconds=settings.ORDER_CHANGES_SETTLE_DELAY)
+    orders = Order.objects.filter(updated_at__lte=settled_at)
+    if position:
+        orders = orders.changed_after(*position)
+
+    page_size = settings.ORDER_CHANGES_PAGE_SIZE
+    orders = list(orders.prefetch_related('items').order_by('updated_at', 'id')[:page_size + 1])
+    has_more = len(orders) > page_size
+    orders = orders[:page_size]
+
+    return Response({
+        'results': OrderChangeSerializer(orders, many=True).data,
+        'cursor': encode_changes_cursor(orders[-1].updated_at, orders[-1].id) if orders else since,
+        'has_more': has_more,
+    })
@@ -0,0 +1,32 @@
+import numpy as np
+from geopy import distance
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def get_distance_matrix(from_coords, to_coords, exact=False):
+    """Расстояния в км между всеми парами точек, координаты в виде (lon, lat).
+
+    По умолчанию считаем по формуле гаверсинусов одной операцией над массивами,
+    exact=True включает точный геодезический расчёт geopy (медленнее в сотни раз).
+    """
+    from_points = np.asarray(from_coords, dtype=float).reshape(-1, 2)
+    to_points = np.asarray(to_coords, dtype=float).reshape(-1, 2)
+
+    if exact:
+        return np.array([
+            [distance.geodesic((from_lat, from_lon), (to_lat, to_lon)).km for to_lon, to_lat in to_points]
+            for from_lon, from_lat in from_points
+        ]).reshape(len(from_points), len(to_points))
+
+    from_lon, from_lat = np.radians(from_points).T
+    to_lon, to_lat = np.radians(to_points).T
+
+    delta_lat = to_lat[np.newaxis, :] - from_lat[:, np.newaxis]
+    delta_lon = to_lon[np.newaxis, :] - from_lon[:, np.newaxis]
+    a = (
+        np.sin(delta_lat / 2) ** 2
+        + np.cos(from_lat)[:, np.newaxis] * np.cos(to_lat)[np.newaxis, :] * np.sin(delta_lon / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
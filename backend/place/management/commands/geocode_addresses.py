@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from place.utils import get_unresolved_addresses, resolve_addresses
+
+
+class Command(BaseCommand):
+    help = 'Определяет координаты адресов заказов и ресторанов в фоне'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Обработать адреса один раз и выйти')
+        parser.add_argument('--interval', type=float, default=10, help='Пауза между проверками, секунд')
+        parser.add_argument('--workers', type=int, default=4, help='Число одновременных запросов к геокодеру')
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            addresses = get_unresolved_addresses()
+            if addresses:
+                resolved = resolve_addresses(addresses, max_workers=options['workers'])
+                self.stdout.write(f'Найдены координаты: {len(resolved)} из {len(addresses)}')
+                for address in sorted(addresses - resolved.keys()):
+                    self.stdout.write(f'Адрес не найден, повторим позже: {address}')
+
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from place.models import Place
+from place.utils import resolve_addresses
+
+
+class Command(BaseCommand):
+    help = 'Показывает адреса, которые геокодер не смог найти, и повторяет запросы по ним'
+
+    def add_arguments(self, parser):
+        parser.add_argument('addresses', nargs='*', help='Адреса для повтора, по умолчанию все неудачные')
+        parser.add_argument('--retry', action='store_true', help='Повторить запрос к геокодеру сейчас')
+        parser.add_argument('--workers', type=int, default=4, help='Число одновременных запросов к геокодеру')
+
+    def handle(self, *args, **options):
+        failed_places = Place.objects.filter(lookup_failed_at__isnull=False).order_by('lookup_failed_at')
+        if options['addresses']:
+            failed_places = failed_places.filter(address_place__in=options['addresses'])
+
+        for place in failed_places:
+            self.stdout.write(f'{place.lookup_failed_at:%Y-%m-%d %H:%M} {place.address_place}: {place.lookup_error}')
+
+        if not options['retry']:
+            return
+
+        addresses = [place.address_place for place in failed_places]
+        resolved = resolve_addresses(addresses, max_workers=options['workers'])
+        self.stdout.write(f'Найдены координаты: {len(resolved)} из {len(addresses)}')
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('place', '0003_alter_place_address_place'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='place',
+            name='address_place',
+            field=models.CharField(max_length=255, unique=True, verbose_name='адрес'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.25 on 2026-10-18 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('place', '0004_alter_place_address_place'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='place',
+            name='lookup_failed_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Геокодер не нашёл адрес'),
+        ),
+        migrations.AddField(
+            model_name='place',
+            name='lookup_error',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Причина ошибки геокодера'),
+        ),
+    ]
@@ -4,7 +4,7 @@ from django.db import models
 class Place(models.Model):
     address_place = models.CharField(
         verbose_name='адрес',
-        max_length=50,
+        max_length=255,
         unique=True,
     )
 
@@ -28,5 +28,17 @@ class Place(models.Model):
         default=timezone.now
     )
 
+    lookup_failed_at = models.DateTimeField(
+        verbose_name='Геокодер не нашёл адрес',
+        blank=True,
+        null=True,
+        db_index=True,
+    )
+    lookup_error = models.CharField(
+        verbose_name='Причина ошибки геокодера',
+        max_length=255,
+        blank=True,
+    )
+
     class Meta:
         unique_together = ['address_place', 'lat', 'lon']
\ No newline at end of file
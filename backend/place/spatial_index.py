@@ -0,0 +1,171 @@
+import heapq
+import math
+from collections import defaultdict
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from foodcartapp.models import Restaurant
+from .distances import EARTH_RADIUS_KM, get_distance_matrix
+from .models import Place
+from .utils import get_addresses_with_coords
+
+
+RESTAURANT_INDEX_VERSION_KEY = 'place:restaurant_index_version'
+CELL_SIZE_KM = 2
+
+
+class RestaurantSpatialIndex:
+    """Сетка с ячейками CELL_SIZE_KM на CELL_SIZE_KM км над координатами ресторанов.
+
+    Точки проецируются на плоскость вокруг средней широты, для города этого достаточно.
+    """
+
+    def __init__(self, restaurant_coords, version=None):
+        self.version = version
+        self.restaurant_coords = {
+            restaurant_id: (float(lon), float(lat))
+            for restaurant_id, (lon, lat) in restaurant_coords.items()
+        }
+        self.cells = defaultdict(list)
+
+        if self.restaurant_coords:
+            latitudes = [lat for _, lat in self.restaurant_coords.values()]
+            self.lon_scale = math.cos(math.radians(sum(latitudes) / len(latitudes)))
+        else:
+            self.lon_scale = 1
+
+        for restaurant_id, coords in self.restaurant_coords.items():
+            point = self.project(*coords)
+            self.cells[self.get_cell(point)].append((restaurant_id, point))
+
+        cell_rows = [row for row, _ in self.cells] or [0]
+        cell_columns = [column for _, column in self.cells] or [0]
+        self.bounds = (min(cell_rows), max(cell_rows), min(cell_columns), max(cell_columns))
+
+    @classmethod
+    def build(cls, version=None):
+        restaurant_addresses = dict(Restaurant.objects.values_list('id', 'address'))
+        address_to_coords = get_addresses_with_coords(restaurant_addresses.values())
+        restaurant_coords = {
+            restaurant_id: address_to_coords[address]
+            for restaurant_id, address in restaurant_addresses.items()
+            if address in address_to_coords
+        }
+        return cls(restaurant_coords, version=version)
+
+    def project(self, lon, lat):
+        return (
+            EARTH_RADIUS_KM * math.radians(lon) * self.lon_scale,
+            EARTH_RADIUS_KM * math.radians(lat),
+        )
+
+    def get_cell(self, point):
+        x, y = point
+        return math.floor(y / CELL_SIZE_KM), math.floor(x / CELL_SIZE_KM)
+
+    def iter_ring(self, center_cell, radius):
+        # Ячейки кольца за пределами занятой ресторанами области пропускаем
+        min_row, max_row, min_column, max_column = self.bounds
+        center_row, center_column = center_cell
+        edge_columns = [
+            column
+            for column in {center_column - radius, center_column + radius}
+            if min_column <= column <= max_column
+        ]
+        inner_columns = range(
+            max(center_column - radius, min_column),
+            min(center_column + radius, max_column) + 1,
+        )
+        for row in range(max(center_row - radius, min_row), min(center_row + radius, max_row) + 1):
+            if row in (center_row - radius, center_row + radius):
+                columns = inner_columns
+            else:
+                columns = edge_columns
+            for column in columns:
+                yield from self.cells.get((row, column), [])
+
+    def get_min_radius(self, center_cell):
+        # Кольца ближе этого радиуса не задевают ни одной занятой ячейки
+        min_row, max_row, min_column, max_column = self.bounds
+        center_row, center_column = center_cell
+        return max(
+            min_row - center_row, center_row - max_row,
+            min_column - center_column, center_column - max_column,
+            0,
+        )
+
+    def get_max_radius(self, center_cell):
+        min_row, max_row, min_column, max_column = self.bounds
+        center_row, center_column = center_cell
+        return max(
+            abs(center_row - min_row), abs(center_row - max_row),
+            abs(center_column - min_column), abs(center_column - max_column),
+        )
+
+    def nearest(self, lon, lat, k, restaurant_ids=None):
+        """Возвращает до k пар (id ресторана, расстояние в км) по возрастанию расстояния.
+
+        restaurant_ids ограничивает поиск, например ресторанами, где есть все товары заказа.
+        """
+        if not k or not self.restaurant_coords:
+            return []
+
+        x, y = point = self.project(float(lon), float(lat))
+        center_cell = self.get_cell(point)
+        closest = []
+
+        for radius in range(self.get_min_radius(center_cell), self.get_max_radius(center_cell) + 1):
+            for restaurant_id, (restaurant_x, restaurant_y) in self.iter_ring(center_cell, radius):
+                if restaurant_ids is not None and restaurant_id not in restaurant_ids:
+                    continue
+                candidate = (-math.hypot(restaurant_x - x, restaurant_y - y), restaurant_id)
+                if len(closest) < k:
+                    heapq.heappush(closest, candidate)
+                elif candidate > closest[0]:
+                    heapq.heapreplace(closest, candidate)
+
+            # Рестораны из следующих колец дальше, чем radius * CELL_SIZE_KM
+            if len(closest) == k and -closest[0][0] <= radius * CELL_SIZE_KM:
+                break
+
+        found_ids = [restaurant_id for _, restaurant_id in sorted(closest, reverse=True)]
+        if not found_ids:
+            return []
+        distances = get_distance_matrix(
+            [(lon, lat)],
+            [self.restaurant_coords[restaurant_id] for restaurant_id in found_ids],
+        )[0]
+        return sorted(zip(found_ids, distances.tolist()), key=lambda found: found[1])
+
+
+_restaurant_index = None
+
+
+def get_restaurant_index():
+    global _restaurant_index
+    version = cache.get_or_set(RESTAURANT_INDEX_VERSION_KEY, lambda: uuid4().hex, timeout=None)
+    if _restaurant_index is None or _restaurant_index.version != version:
+        _restaurant_index = RestaurantSpatialIndex.build(version=version)
+    return _restaurant_index
+
+
+def invalidate_restaurant_index():
+    cache.set(RESTAURANT_INDEX_VERSION_KEY, uuid4().hex, timeout=None)
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+def on_restaurant_change(sender, **kwargs):
+    transaction.on_commit(invalidate_restaurant_index)
+
+
+@receiver(post_save, sender=Place)
+@receiver(post_delete, sender=Place)
+def on_place_change(sender, instance, **kwargs):
+    # Геокодер сохраняет и адреса заказов, индекс они не меняют
+    if Restaurant.objects.filter(address=instance.address_place).exists():
+        transaction.on_commit(invalidate_restaurant_index)
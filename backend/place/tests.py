@@ -1,3 +1,101 @@
-from django.test import TestCase
+import math
+import random
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from foodcartapp.models import Restaurant
+from .models import Place
+from .spatial_index import RestaurantSpatialIndex
+from .utils import GeocoderError, get_unresolved_addresses, resolve_addresses
+
+
+def stub_geocoder(answers):
+    def geocoder(address):
+        answer = answers[address]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+    return geocoder
+
+
+class ResolveAddressesTest(TestCase):
+    def test_found_address_is_saved(self):
+        resolved = resolve_addresses(['Тверская, 1'], geocoder=stub_geocoder({'Тверская, 1': ('37.61', '55.76')}))
+
+        self.assertEqual(resolved, {'Тверская, 1': ('37.61', '55.76')})
+        place = Place.objects.get(address_place='Тверская, 1')
+        self.assertEqual((place.lon, place.lat), (Decimal('37.61'), Decimal('55.76')))
+        self.assertIsNone(place.lookup_failed_at)
+
+    def test_not_found_address_is_marked_failed(self):
+        resolved = resolve_addresses(['Нигде, 0'], geocoder=stub_geocoder({'Нигде, 0': None}))
+
+        self.assertEqual(resolved, {})
+        place = Place.objects.get(address_place='Нигде, 0')
+        self.assertIsNone(place.lat)
+        self.assertIsNotNone(place.lookup_failed_at)
+        self.assertEqual(place.lookup_error, 'Адрес не найден')
+
+    def test_geocoder_error_is_saved(self):
+        geocoder = stub_geocoder({'Тверская, 1': GeocoderError('ConnectTimeout: timed out')})
+
+        resolved = resolve_addresses(['Тверская, 1'], geocoder=geocoder)
+
+        self.assertEqual(resolved, {})
+        place = Place.objects.get(address_place='Тверская, 1')
+        self.assertIsNotNone(place.lookup_failed_at)
+        self.assertEqual(place.lookup_error, 'ConnectTimeout: timed out')
+
+    def test_successful_retry_clears_failure(self):
+        resolve_addresses(['Тверская, 1'], geocoder=stub_geocoder({'Тверская, 1': None}))
+
+        resolve_addresses(['Тверская, 1'], geocoder=stub_geocoder({'Тверская, 1': ('37.61', '55.76')}))
+
+        place = Place.objects.get(address_place='Тверская, 1')
+        self.assertEqual((place.lon, place.lat), (Decimal('37.61'), Decimal('55.76')))
+        self.assertIsNone(place.lookup_failed_at)
+        self.assertEqual(place.lookup_error, '')
+
+
+@override_settings(GEOCODER_RETRY_BACKOFF=60 * 60)
+class UnresolvedAddressesTest(TestCase):
+    def setUp(self):
+        for address in ('Тверская, 1', 'Арбат, 2', 'Сретенка, 3', 'Пятницкая, 4'):
+            Restaurant.objects.create(name=address, address=address)
+        Place.objects.create(address_place='Тверская, 1', lon='37.61', lat='55.76')
+        Place.objects.create(address_place='Арбат, 2', lookup_failed_at=timezone.now() - timedelta(minutes=5))
+        Place.objects.create(address_place='Сретенка, 3', lookup_failed_at=timezone.now() - timedelta(hours=2))
+
+    def test_recent_failures_are_skipped_until_backoff_expires(self):
+        self.assertEqual(get_unresolved_addresses(), {'Сретенка, 3', 'Пятницкая, 4'})
+
+
+class RestaurantSpatialIndexTest(SimpleTestCase):
+    def setUp(self):
+        randomizer = random.Random(0)
+        restaurant_coords = {
+            restaurant_id: (37.3 + randomizer.random() * 0.6, 55.5 + randomizer.random() * 0.4)
+            for restaurant_id in range(200)
+        }
+        self.index = RestaurantSpatialIndex(restaurant_coords)
+
+    def get_nearest_by_brute_force(self, lon, lat, k):
+        x, y = self.index.project(lon, lat)
+        distances = sorted(
+            (math.hypot(restaurant_x - x, restaurant_y - y), restaurant_id)
+            for restaurant_id, (restaurant_x, restaurant_y) in (
+                (restaurant_id, self.index.project(*coords))
+                for restaurant_id, coords in self.index.restaurant_coords.items()
+            )
+        )
+        return [restaurant_id for _, restaurant_id in distances[:k]]
+
+    def test_nearest_matches_brute_force(self):
+        # Центр города, окраина и точки за 1400 км от ресторанов
+        for lon, lat in ((37.62, 55.75), (37.95, 55.45), (60.6, 56.84), (30.5, 45.0), (37.6, 68.0)):
+            with self.subTest(lon=lon, lat=lat):
+                found_ids = [restaurant_id for restaurant_id, _ in self.index.nearest(lon, lat, 5)]
+                self.assertCountEqual(found_ids, self.get_nearest_by_brute_force(lon, lat, 5))
@@ -1,54 +1,114 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
 from .models import Place
 from star_burger.settings import yandex_api_key
 from foodcartapp.models import Order, Restaurant
 import requests
 
+
+class GeocoderError(Exception):
+    pass
+
+
 def fetch_coordinates(apikey, address):
     try:
-        place = Place.objects.filter(address_place=address).first()
-        if place and place.lon and place.lat:
-            return place.lon, place.lat
-        else:
-            base_url = "https://geocode-maps.yandex.ru/1.x"
-            response = requests.get(base_url, params={
-                "geocode": address,
-                "apikey": apikey,
-                "format": "json",
-            })
-            response.raise_for_status()
-            found_places = response.json()['response']['GeoObjectCollection']['featureMember']
-
-            if not found_places:
-                return None
-
-            most_relevant = found_places[0]
-            lon, lat = most_relevant['GeoObject']['Point']['pos'].split(" ")
-            return lon, lat
-    except (requests.RequestException, KeyError, IndexError):
-        return None
-    
-def get_all_addresses_with_coords():
-    order_addresses = Order.objects.values_list('address', flat=True)
+        base_url = "https://geocode-maps.yandex.ru/1.x"
+        response = requests.get(base_url, params={
+            "geocode": address,
+            "apikey": apikey,
+            "format": "json",
+        }, timeout=10)
+        response.raise_for_status()
+        found_places = response.json()['response']['GeoObjectCollection']['featureMember']
+
+        if not found_places:
+            return None
+
+        most_relevant = found_places[0]
+        lon, lat = most_relevant['GeoObject']['Point']['pos'].split(" ")
+        return lon, lat
+    except (requests.RequestException, KeyError, IndexError) as exc:
+        raise GeocoderError(f'{type(exc).__name__}: {exc}') from exc
+
+
+def fetch_coordinates_from_yandex(address):
+    return fetch_coordinates(yandex_api_key, address)
+
+
+def get_all_addresses():
+    # Выполненные заказы менеджеру не показываются, их адреса не нужны
+    order_addresses = Order.objects.exclude(status='Done').values_list('address', flat=True).distinct()
     restaurant_addresses = Restaurant.objects.values_list('address', flat=True)
-    all_addresses = set(order_addresses) | set(restaurant_addresses)
+    return (set(order_addresses) | set(restaurant_addresses)) - {''}
+
+
+def get_unresolved_addresses():
+    all_addresses = get_all_addresses()
+    # Неудачные запросы повторяем не раньше, чем через GEOCODER_RETRY_BACKOFF секунд
+    retry_after = timezone.now() - timedelta(seconds=settings.GEOCODER_RETRY_BACKOFF)
+    skipped_addresses = Place.objects.filter(address_place__in=all_addresses).filter(
+        Q(lat__isnull=False, lon__isnull=False) | Q(lookup_failed_at__gt=retry_after)
+    ).values_list('address_place', flat=True)
+    return all_addresses - set(skipped_addresses)
+
+
+def get_failed_addresses(addresses):
+    return set(
+        Place.objects
+        .filter(address_place__in=addresses, lookup_failed_at__isnull=False)
+        .values_list('address_place', flat=True)
+    )
+
+
+def geocode(geocoder, address):
+    try:
+        coords = geocoder(address)
+    except GeocoderError as exc:
+        return None, str(exc)[:255]
+    if coords is None:
+        return None, 'Адрес не найден'
+    return coords, ''
 
-    existing_places = Place.objects.filter(address_place__in=all_addresses)
-    address_to_coords = {
-        place.address_place: (place.lon, place.lat)
-        for place in existing_places
-        if place.lon and place.lat
-    }
 
-    missing_addresses = [addr for addr in all_addresses if addr not in address_to_coords]
+def resolve_addresses(addresses, geocoder=fetch_coordinates_from_yandex, max_workers=4):
+    # В потоках только запросы к геокодеру, в базу пишем из основного потока
+    addresses = list(addresses)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(lambda address: geocode(geocoder, address), addresses))
 
-    for address in missing_addresses:
-        coords = fetch_coordinates(yandex_api_key, address)
+    resolved = {}
+    for address, (coords, error) in zip(addresses, results):
         if coords is None:
-            print(f"Адрес не найден: {address}")
+            Place.objects.update_or_create(address_place=address, defaults={
+                'lon': None,
+                'lat': None,
+                'lookup_failed_at': timezone.now(),
+                'lookup_error': error,
+            })
             continue
-
         lon, lat = coords
-        Place.objects.create(address_place=address, lon=lon, lat=lat)
-        address_to_coords[address] = (lon, lat)
+        Place.objects.update_or_create(address_place=address, defaults={
+            'lon': lon,
+            'lat': lat,
+            'lookup_failed_at': None,
+            'lookup_error': '',
+        })
+        resolved[address] = (lon, lat)
+    return resolved
+
 
-    return address_to_coords
\ No newline at end of file
+def get_addresses_with_coords(addresses):
+    existing_places = Place.objects.filter(
+        address_place__in=addresses,
+        lat__isnull=False,
+        lon__isnull=False,
+    )
+    return {
+        address: (lon, lat)
+        for address, lon, lat in existing_places.values_list('address_place', 'lon', 'lat')
+    }
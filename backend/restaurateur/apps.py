@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class RestaurateurConfig(AppConfig):
     name = 'restaurateur'
+
+    def ready(self):
+        from . import products_matrix  # noqa: F401
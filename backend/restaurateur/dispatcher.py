@@ -0,0 +1,146 @@
+from collections import Counter, defaultdict
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from foodcartapp.menu_index import get_menu_index
+from foodcartapp.models import Order, OrderItem, Restaurant
+from foodcartapp.order_changes import mark_orders_changed
+from place.distances import get_distance_matrix
+from place.spatial_index import get_restaurant_index
+from place.utils import get_addresses_with_coords
+
+
+NO_COORDINATES = 'координаты адреса не определены'
+NO_RESTAURANTS = 'нет ресторана со всеми товарами'
+NO_CAPACITY = 'подходящие рестораны загружены'
+
+
+class DispatchPlan:
+    """Назначения заказ → ресторан и причины, по которым заказы остались без ресторана."""
+
+    def __init__(self, assignments, unassigned, free_capacity):
+        self.assignments = assignments
+        self.unassigned = unassigned
+        self.free_capacity = free_capacity
+
+    @property
+    def total_distance(self):
+        return sum(distance for _, _, distance in self.assignments)
+
+    def get_restaurant_loads(self):
+        return Counter(restaurant_id for _, restaurant_id, _ in self.assignments)
+
+    def get_unassigned_reasons(self):
+        return Counter(self.unassigned.values())
+
+
+def get_dispatch_candidates():
+    return Order.objects.filter(status='Raw', restaurant__isnull=True)
+
+
+def get_free_capacity(capacity):
+    return {
+        restaurant.id: max(capacity - restaurant.active_orders_count, 0)
+        for restaurant in Restaurant.objects.with_order_stats()
+    }
+
+
+def assign_greedy(distances, capacities):
+    """Жадно раздаёт заказы (строки матрицы) ресторанам (столбцы), начиная с самых близких пар.
+
+    np.inf в матрице — ресторан заказу не подходит. Возвращает номер ресторана
+    для каждого заказа или -1, если подходящих ресторанов со свободными местами нет.
+    """
+    capacities = list(capacities)
+    assignment = [-1] * len(distances)
+    orders_left = len(distances)
+    places_left = sum(capacities)
+
+    order_indexes, restaurant_indexes = np.nonzero(np.isfinite(distances))
+    closest_first = np.argsort(distances[order_indexes, restaurant_indexes], kind='stable')
+    for order_index, restaurant_index in zip(
+        order_indexes[closest_first].tolist(),
+        restaurant_indexes[closest_first].tolist(),
+    ):
+        if assignment[order_index] != -1 or not capacities[restaurant_index]:
+            continue
+        assignment[order_index] = restaurant_index
+        capacities[restaurant_index] -= 1
+        orders_left -= 1
+        places_left -= 1
+        if not orders_left or not places_left:
+            break
+    return assignment
+
+
+def plan_dispatch(capacity):
+    orders = get_dispatch_candidates()
+    # При равных расстояниях ресторан достаётся заказу, который ждёт дольше
+    order_addresses = dict(orders.order_by('registered_at', 'id').values_list('id', 'address'))
+    order_products = defaultdict(set)
+    for order_id, product_id in OrderItem.objects.filter(order__in=orders).values_list('order', 'product'):
+        order_products[order_id].add(product_id)
+
+    free_capacity = get_free_capacity(capacity)
+    menu_index = get_menu_index()
+    restaurant_coords = get_restaurant_index().restaurant_coords
+    address_to_coords = get_addresses_with_coords(set(order_addresses.values()))
+
+    # Столбцы матрицы — рестораны с координатами в порядке индекса меню
+    menu_columns = [
+        column for column, restaurant_id in enumerate(menu_index.restaurant_ids)
+        if restaurant_id in restaurant_coords and restaurant_id in free_capacity
+    ]
+    restaurant_ids = [menu_index.restaurant_ids[column] for column in menu_columns]
+
+    unassigned = {}
+    order_ids = []
+    eligible_rows = []
+    for order_id, address in order_addresses.items():
+        eligible = menu_index.get_restaurant_flags(order_products[order_id])[menu_columns]
+        if address not in address_to_coords:
+            unassigned[order_id] = NO_COORDINATES
+        elif not order_products[order_id] or not eligible.any():
+            unassigned[order_id] = NO_RESTAURANTS
+        else:
+            order_ids.append(order_id)
+            eligible_rows.append(eligible)
+
+    assignments = []
+    if order_ids:
+        distances = get_distance_matrix(
+            [address_to_coords[order_addresses[order_id]] for order_id in order_ids],
+            [restaurant_coords[restaurant_id] for restaurant_id in restaurant_ids],
+        )
+        distances[~np.array(eligible_rows)] = np.inf
+
+        capacities = [free_capacity[restaurant_id] for restaurant_id in restaurant_ids]
+        for row, column in enumerate(assign_greedy(distances, capacities)):
+            if column == -1:
+                unassigned[order_ids[row]] = NO_CAPACITY
+                continue
+            assignments.append((order_ids[row], restaurant_ids[column], float(distances[row, column])))
+
+    return DispatchPlan(assignments, unassigned, free_capacity)
+
+
+def apply_dispatch(plan):
+    order_ids_by_restaurant = defaultdict(list)
+    for order_id, restaurant_id, _ in plan.assignments:
+        order_ids_by_restaurant[restaurant_id].append(order_id)
+
+    assigned_count = 0
+    now = timezone.now()
+    with transaction.atomic():
+        for restaurant_id, order_ids in order_ids_by_restaurant.items():
+            # Заказ, которому менеджер уже выбрал ресторан, не перезаписываем
+            assigned_count += (
+                get_dispatch_candidates()
+                .filter(id__in=order_ids)
+                .update(restaurant_id=restaurant_id, updated_at=now)
+            )
+        if assigned_count:
+            transaction.on_commit(mark_orders_changed)
+    return assigned_count
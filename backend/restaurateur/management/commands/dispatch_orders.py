@@ -0,0 +1,62 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from foodcartapp.models import Restaurant
+from restaurateur.dispatcher import apply_dispatch, plan_dispatch
+
+
+class Command(BaseCommand):
+    help = 'Назначает необработанным заказам ближайшие рестораны с учётом их загрузки'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Только показать план, ничего не сохранять')
+        parser.add_argument('--once', action='store_true', help='Распределить заказы один раз и выйти')
+        parser.add_argument('--interval', type=float, default=60, help='Пауза между запусками, секунд')
+        parser.add_argument(
+            '--capacity', type=int, default=settings.DISPATCHER_RESTAURANT_CAPACITY,
+            help='Сколько активных заказов может быть у ресторана',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            started_at = time.perf_counter()
+            plan = plan_dispatch(options['capacity'])
+            planned_in = time.perf_counter() - started_at
+
+            if options['dry_run']:
+                self.write_report(plan, planned_in)
+                break
+
+            if plan.assignments:
+                assigned_count = apply_dispatch(plan)
+                self.stdout.write(f'Назначено заказов: {assigned_count}, без ресторана: {len(plan.unassigned)}')
+
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+
+    def write_report(self, plan, planned_in):
+        assigned_count = len(plan.assignments)
+        self.stdout.write(f'План построен за {planned_in:.2f} с')
+        self.stdout.write(f'Будет назначено заказов: {assigned_count}')
+        if assigned_count:
+            self.stdout.write(
+                f'Суммарное расстояние: {plan.total_distance:.1f} км, '
+                f'в среднем {plan.total_distance / assigned_count:.2f} км'
+            )
+
+        self.stdout.write(f'Останутся без ресторана: {len(plan.unassigned)}')
+        for reason, count in plan.get_unassigned_reasons().most_common():
+            self.stdout.write(f'  {reason}: {count}')
+
+        loads = plan.get_restaurant_loads()
+        if loads:
+            restaurant_names = Restaurant.objects.in_bulk(loads.keys())
+            self.stdout.write('Загрузка ресторанов (новые заказы / свободно до запуска):')
+            for restaurant_id, count in loads.most_common():
+                name = restaurant_names[restaurant_id].name
+                self.stdout.write(f'  {name}: {count} / {plan.free_capacity[restaurant_id]}')
@@ -0,0 +1,86 @@
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from foodcartapp.models import Product, ProductCategory, Restaurant, RestaurantMenuItem
+from foodcartapp.thumbnails import get_thumbnail_url
+
+
+PRODUCTS_MATRIX_CACHE_KEY = 'restaurateur:products_matrix'
+# Имя фрагмента {% cache %} в products_list.html
+PRODUCTS_MATRIX_FRAGMENT = 'products_matrix'
+
+
+class ProductsMatrix:
+    """Наличие товаров в ресторанах: по целому числу на товар, бит i — ресторан i."""
+
+    def __init__(self, restaurants, products, masks, version):
+        self.restaurants = restaurants
+        self.products = products
+        self.masks = masks
+        self.version = version
+
+    @classmethod
+    def build(cls):
+        restaurants = list(Restaurant.objects.order_by('name').values('id', 'name'))
+        restaurant_bits = {restaurant['id']: bit for bit, restaurant in enumerate(restaurants)}
+
+        products = [
+            {
+                'id': product.id,
+                'name': product.name,
+                'category': product.category.name if product.category else None,
+                'price': product.price,
+                'thumbnail_url': get_thumbnail_url(product, 100),
+            }
+            for product in Product.objects.select_related('category').order_by('id')
+        ]
+
+        masks = dict.fromkeys((product['id'] for product in products), 0)
+        available_items = (
+            RestaurantMenuItem.objects
+            .filter(availability=True)
+            .values_list('product_id', 'restaurant_id')
+        )
+        for product_id, restaurant_id in available_items:
+            masks[product_id] |= 1 << restaurant_bits[restaurant_id]
+
+        return cls(restaurants, products, [masks[product['id']] for product in products], uuid4().hex)
+
+    def __iter__(self):
+        restaurant_bits = [1 << bit for bit in range(len(self.restaurants))]
+        for product, mask in zip(self.products, self.masks):
+            yield product, [bool(mask & bit) for bit in restaurant_bits]
+
+
+def get_products_matrix():
+    matrix = cache.get(PRODUCTS_MATRIX_CACHE_KEY)
+    if matrix is None:
+        matrix = ProductsMatrix.build()
+        cache.set(PRODUCTS_MATRIX_CACHE_KEY, matrix, timeout=None)
+    return matrix
+
+
+def invalidate_products_matrix():
+    # Фрагмент шаблона привязан к версии матрицы, без удаления он остался бы в кэше сиротой
+    matrix = cache.get(PRODUCTS_MATRIX_CACHE_KEY)
+    stale_keys = [PRODUCTS_MATRIX_CACHE_KEY]
+    if matrix is not None:
+        stale_keys.append(make_template_fragment_key(PRODUCTS_MATRIX_FRAGMENT, [matrix.version]))
+    cache.delete_many(stale_keys)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_delete, sender=ProductCategory)
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+@receiver(post_save, sender=RestaurantMenuItem)
+@receiver(post_delete, sender=RestaurantMenuItem)
+def on_products_matrix_change(sender, **kwargs):
+    transaction.on_commit(invalidate_products_matrix)
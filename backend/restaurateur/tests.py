@@ -1,3 +1,121 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import urlsafe_base64_encode
+
+from foodcartapp.models import Order, Product, Restaurant, RestaurantMenuItem
+from foodcartapp.order_changes import encode_changes_cursor, mark_orders_changed
+from .products_matrix import PRODUCTS_MATRIX_FRAGMENT, get_products_matrix
+from .views import encode_orders_cursor
+
+
+@override_settings(MANAGER_ORDERS_PAGE_SIZE=5, MANAGER_ORDERS_UPDATES_LOOKBACK=10)
+class OrdersUpdatesTest(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('manager', is_staff=True))
+
+    def poll(self, since, drain=False, **page_bounds):
+        params = {'since': since, **page_bounds}
+        if drain:
+            params['drain'] = '1'
+        return self.client.get(reverse('restaurateur:orders_updates'), params)
+
+    def test_naive_cursor_is_rejected(self):
+        response = self.poll(urlsafe_base64_encode(b'["2026-01-01T00:00:00", 0]'))
+        self.assertEqual(response.status_code, 400)
+
+    def test_no_changes_after_cursor(self):
+        mark_orders_changed()
+        response = self.poll(encode_changes_cursor(timezone.now() + timedelta(seconds=1), 0))
+        self.assertEqual(response.status_code, 204)
+
+    def test_changes_with_one_timestamp_are_delivered_in_full(self):
+        since = encode_changes_cursor(timezone.now() - timedelta(minutes=5), 0)
+        orders = Order.objects.bulk_create([
+            Order(firstname='Иван', lastname='Петров', phonenumber='+79291000000', address=f'Тверская, {number}')
+            for number in range(23)
+        ])
+        # Так заказы меняет dispatch_orders: одна метка времени на всю пачку
+        Order.objects.update(updated_at=timezone.now() - timedelta(minutes=1))
+        mark_orders_changed()
+
+        delivered_ids = set()
+        drain = False
+        for _ in range(10):
+            response = self.poll(since, drain)
+            self.assertEqual(response.status_code, 200)
+            updates = response.json()
+            delivered_ids.update(row['id'] for row in updates['rows'])
+            since, drain = updates['cursor'], updates['more']
+            if not drain:
+                break
+
+        self.assertEqual(delivered_ids, {order.id for order in orders})
+
+    def test_recent_changes_are_sent_again_until_settled(self):
+        order = Order.objects.create(firstname='Иван', lastname='Петров', phonenumber='+79291000000', address='Тверская, 1')
+        mark_orders_changed()
+        since = encode_changes_cursor(timezone.now() - timedelta(minutes=5), 0)
+
+        first = self.poll(since).json()
+        second = self.poll(first['cursor']).json()
+
+        self.assertEqual([row['id'] for row in first['rows']], [order.id])
+        self.assertEqual([row['id'] for row in second['rows']], [order.id])
+
+    def test_updates_stay_within_page_bounds(self):
+        since = encode_changes_cursor(timezone.now() - timedelta(minutes=5), 0)
+        registered_at = timezone.now() - timedelta(hours=1)
+        orders = Order.objects.bulk_create([
+            Order(
+                firstname='Иван', lastname='Петров', phonenumber='+79291000000', address=f'Тверская, {number}',
+                registered_at=registered_at + timedelta(minutes=number),
+            )
+            for number in range(15)
+        ])
+        Order.objects.update(updated_at=timezone.now() - timedelta(minutes=1))
+        mark_orders_changed()
+
+        page = self.client.get(reverse('restaurateur:view_orders'), {'cursor': encode_orders_cursor(orders[4])})
+        self.assertEqual([order.id for order in page.context['order_items']], [order.id for order in orders[5:10]])
+        self.assertIn('until=', page.context['updates_url'])
+
+        page_bounds = {'cursor': encode_orders_cursor(orders[4]), 'until': encode_orders_cursor(orders[9])}
+        delivered_ids, removed_ids = set(), set()
+        drain = False
+        for _ in range(10):
+            updates = self.poll(since, drain, **page_bounds).json()
+            delivered_ids.update(row['id'] for row in updates['rows'])
+            removed_ids.update(updates['removed'])
+            since, drain = updates['cursor'], updates['more']
+            if not drain:
+                break
+
+        self.assertEqual(delivered_ids, {order.id for order in orders[5:10]})
+        self.assertEqual(removed_ids, {order.id for order in orders[:5] + orders[10:]})
+
+
+class ProductsMatrixTest(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('manager', is_staff=True))
+
+    def test_invalidation_removes_rendered_fragment(self):
+        product = Product.objects.create(name='Чизбургер', price=100, image='cheeseburger.jpg')
+        restaurant = Restaurant.objects.create(name='Star Burger', address='Тверская, 1')
+        with self.captureOnCommitCallbacks(execute=True):
+            menu_item = RestaurantMenuItem.objects.create(restaurant=restaurant, product=product)
+
+        self.client.get(reverse('restaurateur:ProductsView'))
+        fragment_key = make_template_fragment_key(PRODUCTS_MATRIX_FRAGMENT, [get_products_matrix().version])
+        self.assertIsNotNone(cache.get(fragment_key))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            menu_item.availability = False
+            menu_item.save()
+
+        self.assertIsNone(cache.get(fragment_key))
@@ -1,10 +1,16 @@
+import json
+from datetime import datetime, timedelta
+
 from django import forms
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse
 from django.shortcuts import redirect, render
+from django.template.loader import render_to_string
 from django.views import View
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
+from django.utils import timezone
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
 from django.contrib.auth.decorators import user_passes_test
-from django.db.models import F, Sum
-from geopy import distance
 from place.models import Place
 
 from django.contrib.auth import authenticate, login
@@ -12,9 +18,12 @@ from django.contrib.auth import views as auth_views
 from environs import Env
 import requests
 
-from foodcartapp.models import Product, Restaurant, Order
+from foodcartapp.models import Restaurant, Order
+from foodcartapp.order_changes import decode_changes_cursor, encode_changes_cursor, get_orders_changed_at
 from star_burger.settings import yandex_api_key
-from place.utils import fetch_coordinates, get_all_addresses_with_coords
+from place.spatial_index import get_restaurant_index
+from .products_matrix import get_products_matrix
+from place.utils import get_addresses_with_coords, get_failed_addresses
 
 class Login(forms.Form):
     username = forms.CharField(
@@ -33,6 +42,57 @@ class Login(forms.Form):
     )
 
 
+class OrdersFilter(forms.Form):
+    status = forms.MultipleChoiceField(
+        label='Статус', required=False,
+        choices=sorted(Order.ORDER_STATUS),
+        widget=forms.SelectMultiple(attrs={'class': 'form-control'}),
+    )
+    restaurant = forms.ModelChoiceField(
+        label='Ресторан', required=False,
+        queryset=Restaurant.objects.order_by('name'),
+        widget=forms.Select(attrs={'class': 'form-control'}),
+    )
+    registered_from = forms.DateTimeField(
+        label='Зарегистрирован с', required=False,
+        widget=forms.DateTimeInput(attrs={'class': 'form-control', 'type': 'datetime-local'}),
+    )
+    registered_to = forms.DateTimeField(
+        label='по', required=False,
+        widget=forms.DateTimeInput(attrs={'class': 'form-control', 'type': 'datetime-local'}),
+    )
+
+    def filter(self, orders):
+        if not self.is_valid():
+            return orders.exclude(status='Done')
+
+        filters = self.cleaned_data
+        if filters['status']:
+            orders = orders.filter(status__in=filters['status'])
+        else:
+            orders = orders.exclude(status='Done')
+        if filters['restaurant']:
+            orders = orders.filter(restaurant=filters['restaurant'])
+        if filters['registered_from']:
+            orders = orders.filter(registered_at__gte=filters['registered_from'])
+        if filters['registered_to']:
+            orders = orders.filter(registered_at__lt=filters['registered_to'])
+        return orders
+
+
+def encode_orders_cursor(order):
+    position = [order.status, order.registered_at.isoformat(), order.id]
+    return urlsafe_base64_encode(json.dumps(position).encode())
+
+
+def decode_orders_cursor(cursor):
+    try:
+        status, registered_at, order_id = json.loads(urlsafe_base64_decode(cursor))
+        return str(status), datetime.fromisoformat(registered_at), int(order_id)
+    except (TypeError, ValueError):
+        return None
+
+
 class LoginView(View):
     def get(self, request, *args, **kwargs):
         form = Login()
@@ -70,80 +130,184 @@ def is_manager(user):
 
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_products(request):
-    restaurants = list(Restaurant.objects.order_by('name'))
-    products = list(Product.objects.prefetch_related('menu_items'))
-
-    products_with_restaurant_availability = []
-    for product in products:
-        availability = {item.restaurant_id: item.availability for item in product.menu_items.all()}
-        ordered_availability = [availability.get(restaurant.id, False) for restaurant in restaurants]
-
-        products_with_restaurant_availability.append(
-            (product, ordered_availability)
-        )
-
     return render(request, template_name="products_list.html", context={
-        'products_with_restaurant_availability': products_with_restaurant_availability,
-        'restaurants': restaurants,
+        'matrix': get_products_matrix(),
     })
 
 
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_restaurants(request):
     return render(request, template_name="restaurants_list.html", context={
-        'restaurants': Restaurant.objects.all(),
+        'restaurants': Restaurant.objects.with_order_stats().order_by('name'),
     })
 
 
-@user_passes_test(is_manager, login_url='restaurateur:login')
-def view_orders(request):
-    address_to_coords = get_all_addresses_with_coords()
-
-    orders = (
-        Order.objects
-        .exclude(status='Done')
-        .prefetch_related('items__product')
-        .order_by('status')
-        .with_available_restaurants()
-    )
+def add_restaurants_with_distance(orders):
+    order_addresses = {order.address for order in orders}
+    address_to_coords = get_addresses_with_coords(order_addresses)
+    failed_addresses = get_failed_addresses(order_addresses - address_to_coords.keys())
+    restaurant_index = get_restaurant_index()
 
     for order in orders:
         order_coords = address_to_coords.get(order.address)
 
+        # Координаты определяет фоновая команда geocode_addresses
         if not order_coords:
-            order.address_not_found = True
+            order.address_not_found = order.address in failed_addresses
+            order.coordinates_pending = not order.address_not_found
             continue
 
-        order.address_not_found = False
+        order.coordinates_pending = False
 
-        restaurants_with_distance = []
+        restaurants = {restaurant.id: restaurant for restaurant in order.restaurants}
+        nearest_restaurants = restaurant_index.nearest(
+            *order_coords,
+            k=settings.MANAGER_NEAREST_RESTAURANTS,
+            restaurant_ids=restaurants.keys(),
+        )
+        restaurants_with_distance = [
+            {
+                'name': restaurants[restaurant_id].name,
+                'address': restaurants[restaurant_id].address,
+                'distance': round(dist_km, 2),
+            }
+            for restaurant_id, dist_km in nearest_restaurants
+        ]
+        restaurants_with_distance += [
+            {
+                'name': restaurant.name,
+                'address': restaurant.address,
+                'distance': "координаты уточняются",
+            }
+            for restaurant in order.restaurants
+            if restaurant.id not in restaurant_index.restaurant_coords
+        ]
 
-        for restaurant in order.restaurants:
-            restaurant_coords = address_to_coords.get(restaurant.address)
+        order.restaurants = restaurants_with_distance
 
-            if restaurant_coords:
-                try:
-                    
-                    rest_point = (float(restaurant_coords[1]), float(restaurant_coords[0]))
-                    order_point = (float(order_coords[1]), float(order_coords[0]))
-                    dist_km = round(distance.distance(rest_point, order_point).km, 2)
-                except Exception:
-                    dist_km = "Ошибка определения координат"
-            else:
-                dist_km = "Ошибка определения координат"
 
-            restaurants_with_distance.append({
-                'name': restaurant.name,
-                'address': restaurant.address,
-                'distance': dist_km,
-            })
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def view_orders(request):
+    orders_filter = OrdersFilter(request.GET)
+    orders = (
+        orders_filter.filter(Order.objects.all())
+        .select_related('restaurant')
+        .prefetch_related('items')
+        .with_total()
+        .order_by('status', 'registered_at', 'id')
+    )
 
-        order.restaurants = sorted(
-            restaurants_with_distance,
-            key=lambda r: (r['distance'] if isinstance(r['distance'], (int, float)) else float('inf'), r['name'])
-        )
+    position = decode_orders_cursor(request.GET.get('cursor', ''))
+    if position:
+        orders = orders.after_position(*position)
+
+    # Подбор ресторанов и расстояния считаем только для заказов на странице
+    page_size = settings.MANAGER_ORDERS_PAGE_SIZE
+    orders = list(orders[:page_size + 1].with_available_restaurants())
+    next_page_url = None
+    if len(orders) > page_size:
+        orders = orders[:page_size]
+        next_page_query = request.GET.copy()
+        next_page_query['cursor'] = encode_orders_cursor(orders[-1])
+        next_page_url = f'?{next_page_query.urlencode()}'
+
+    add_restaurants_with_distance(orders)
+
+    # Живые обновления ограничены границами страницы: курсор снизу, последний заказ сверху
+    updates_query = request.GET.copy()
+    if next_page_url:
+        updates_query['until'] = encode_orders_cursor(orders[-1])
+    first_page_query = request.GET.copy()
+    first_page_query.pop('cursor', None)
+    return render(request, 'order_items.html', {
+        'order_items': orders,
+        'filter_form': orders_filter,
+        'next_page_url': next_page_url,
+        'first_page_url': f'?{first_page_query.urlencode()}' if position else None,
+        'is_first_page': not position,
+        'return_url': request.get_full_path(),
+        'updates_url': f"{reverse('restaurateur:orders_updates')}?{updates_query.urlencode()}",
+        'updates_since': encode_changes_cursor(
+            timezone.now() - timedelta(seconds=settings.MANAGER_ORDERS_UPDATES_LOOKBACK), 0,
+        ),
+        'updates_interval': settings.MANAGER_ORDERS_UPDATES_INTERVAL,
+    })
 
-    return render(request, 'order_items.html', {'order_items': orders})
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def view_orders_updates(request):
+    position = decode_changes_cursor(request.GET.get('since', ''))
+    if position is None:
+        return HttpResponseBadRequest('since is required')
+
+    # Пока заказы не менялись после курсора, отвечаем сразу, без запросов к заказам.
+    # Пачку, которая не поместилась в прошлый ответ, дочитываем без этой проверки
+    orders_changed_at = get_orders_changed_at()
+    draining = request.GET.get('drain') == '1'
+    if not draining and orders_changed_at is not None and orders_changed_at < position[0]:
+        return HttpResponse(status=204)
+
+    page_size = settings.MANAGER_ORDERS_PAGE_SIZE
+    changes = list(
+        Order.objects
+        .changed_after(*position)
+        .order_by('updated_at', 'id')
+        .values_list('id', 'updated_at')[:page_size]
+    )
+    changed_ids = [order_id for order_id, _ in changes]
+
+    # updated_at записывается до коммита: курсор не заходит за последние LOOKBACK секунд,
+    # чтобы не пропустить транзакцию, которая закоммитится позже. Свежие строки
+    # придут повторно, на странице они просто перерисуются
+    settled_at = timezone.now() - timedelta(seconds=settings.MANAGER_ORDERS_UPDATES_LOOKBACK)
+    settled_changes = [change for change in changes if change[1] <= settled_at]
+    has_more = len(changes) == page_size
+    if has_more:
+        if settled_changes:
+            order_id, updated_at = settled_changes[-1]
+            position = (updated_at, order_id)
+    else:
+        position = max(position, (settled_at, 0))
+    # Сразу за следующей пачкой идём, только если курсор сдвинулся
+    has_more = has_more and bool(settled_changes)
+
+    orders_filter = OrdersFilter(request.GET)
+    orders = orders_filter.filter(Order.objects.filter(id__in=changed_ids))
+    # Заказы, ушедшие за границы страницы, попадут в removed и пропадут с неё
+    page_start = decode_orders_cursor(request.GET.get('cursor', ''))
+    if page_start:
+        orders = orders.after_position(*page_start)
+    page_end = decode_orders_cursor(request.GET.get('until', ''))
+    if page_end:
+        orders = orders.up_to_position(*page_end)
+    orders = list(
+        orders
+        .select_related('restaurant')
+        .prefetch_related('items')
+        .with_total()
+        .order_by('status', 'registered_at', 'id')
+        .with_available_restaurants()
+    )
+    add_restaurants_with_distance(orders)
+
+    page_query = request.GET.copy()
+    page_query.pop('since', None)
+    page_query.pop('drain', None)
+    page_query.pop('until', None)
+    return_url = f"{reverse('restaurateur:view_orders')}?{page_query.urlencode()}"
+    visible_ids = {order.id for order in orders}
+    return JsonResponse({
+        'cursor': encode_changes_cursor(*position),
+        'more': has_more,
+        'rows': [
+            {
+                'id': order.id,
+                'html': render_to_string('order_row.html', {'item': order, 'return_url': return_url}, request),
+            }
+            for order in orders
+        ],
+        'removed': [order_id for order_id in changed_ids if order_id not in visible_ids],
+    })
 from django.shortcuts import render
 from django.http import HttpResponse
 
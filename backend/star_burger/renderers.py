@@ -0,0 +1,47 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def encode_default(obj):
+    # Decimal, ленивые строки и прочее, что orjson не умеет сам, кодируем как Django
+    return DjangoJSONEncoder().default(obj)
+
+
+def dumps(data, pretty=False):
+    if orjson:
+        option = orjson.OPT_INDENT_2 if pretty else 0
+        return orjson.dumps(data, default=encode_default, option=option)
+    return json.dumps(
+        data,
+        cls=DjangoJSONEncoder,
+        ensure_ascii=False,
+        indent=2 if pretty else None,
+        separators=None if pretty else (',', ':'),
+    ).encode()
+
+
+def prettify(payload):
+    return dumps(json.loads(payload), pretty=True)
+
+
+def wants_pretty(request):
+    return request.GET.get('pretty') == '1'
+
+
+class FastJSONRenderer(BaseRenderer):
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        request = (renderer_context or {}).get('request')
+        return dumps(data, pretty=bool(request) and wants_pretty(request))
@@ -27,6 +27,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'debug_toolbar',
     'phonenumber_field',
     'rest_framework',
@@ -84,6 +85,9 @@ WSGI_APPLICATION = 'star_burger.wsgi.application'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
+# Ширины превью картинок товаров, в пикселях
+THUMBNAIL_WIDTHS = env.list('THUMBNAIL_WIDTHS', [100, 300, 600], subcast=int)
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -95,6 +99,22 @@ DATABASES = {
     }
 }
 
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'star_burger.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+# Кэш общий для всех воркеров gunicorn и фоновых команд. В docker-compose это Redis,
+# таблица django_cache — запасной вариант для разработки без него: каждое чтение идёт в базу
+CACHES = {
+    'default': {
+        'BACKEND': env.str('CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': env.str('CACHE_LOCATION', 'django_cache'),
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -145,6 +165,24 @@ STATICFILES_DIRS = [
 ]
 
 yandex_api_key = env("YANDEX_GEOCODE_API_KEY")
+GEOCODER_RETRY_BACKOFF = env.int('GEOCODER_RETRY_BACKOFF', 24 * 60 * 60)
+
+ORDER_BATCH_MAX_SIZE = env.int('ORDER_BATCH_MAX_SIZE', 500)
+ORDER_CHANGES_PAGE_SIZE = env.int('ORDER_CHANGES_PAGE_SIZE', 100)
+ORDER_CHANGES_SETTLE_DELAY = env.int('ORDER_CHANGES_SETTLE_DELAY', 5)
+PRODUCT_SEARCH_LIMIT = env.int('PRODUCT_SEARCH_LIMIT', 20)
+# В часы пик: принимать заказы в очередь, создаёт их команда process_order_intake
+ORDER_INTAKE_QUEUE = env.bool('ORDER_INTAKE_QUEUE', False)
+
+# Для больших каталогов: отдавать товары потоком вместо кэшированного ответа
+CATALOG_STREAMING = env.bool('CATALOG_STREAMING', False)
+CATALOG_STREAMING_CHUNK_SIZE = env.int('CATALOG_STREAMING_CHUNK_SIZE', 2000)
+
+MANAGER_NEAREST_RESTAURANTS = env.int('MANAGER_NEAREST_RESTAURANTS', 5)
+MANAGER_ORDERS_PAGE_SIZE = env.int('MANAGER_ORDERS_PAGE_SIZE', 50)
+MANAGER_ORDERS_UPDATES_INTERVAL = env.int('MANAGER_ORDERS_UPDATES_INTERVAL', 5)
+MANAGER_ORDERS_UPDATES_LOOKBACK = env.int('MANAGER_ORDERS_UPDATES_LOOKBACK', 10)
+DISPATCHER_RESTAURANT_CAPACITY = env.int('DISPATCHER_RESTAURANT_CAPACITY', 20)
 
 
 ROLLBAR = {
@@ -23,6 +23,7 @@ sleep 5
 
 echo "✨ Дополнительные команды..."
 docker-compose -f "$COMPOSE_FILE" -p "$COMPOSE_PROJECT" exec -T backend python manage.py migrate --noinput
+docker-compose -f "$COMPOSE_FILE" -p "$COMPOSE_PROJECT" exec -T backend python manage.py create_thumbnails
 docker-compose -f "$COMPOSE_FILE" -p "$COMPOSE_PROJECT" exec -T backend python manage.py collectstatic --noinput
 
 echo ""
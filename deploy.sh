@@ -93,6 +93,9 @@ run_on_server "
     echo 'Создание таблиц БД...'
     sleep 5
     docker-compose -f docker-compose.prod.yml exec -T backend python manage.py migrate --noinput
+
+    echo 'Создание превью картинок товаров...'
+    docker-compose -f docker-compose.prod.yml exec -T backend python manage.py create_thumbnails
     
     echo 'Сборка статических файлов...'
     docker-compose -f docker-compose.prod.yml exec -T backend python manage.py collectstatic --noinput
@@ -20,6 +20,9 @@ pip install --no-cache-dir -r backend/requirements.txt
 echo "🧱 Apply Django migrations"
 python backend/manage.py migrate --noinput
 
+echo "🖼 Create product thumbnails"
+python backend/manage.py create_thumbnails
+
 echo "🎨 Collect Django static"
 python backend/manage.py collectstatic --noinput
 